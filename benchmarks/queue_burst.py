@@ -0,0 +1,205 @@
+"""Stress benchmark for queue pops under bursts of concurrent joins.
+
+Thousands of simulated players join a guild's queues at the same time through the real queue command, with fake Discord
+objects that add latency to every API call. Afterwards it checks that every game has exactly one queue's worth of
+players, nobody ended up in two games or in a game and a queue, and players of games that failed to be created got their
+places back. Exits with status 1 if any check fails.
+
+    python benchmarks/queue_burst.py [--joins N ...] [--queues N] [--size N] [--latency SECONDS] [--fail-rate RATE]
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sixMans.broadcaster import StatusBroadcaster
+from sixMans.queue import SixMansQueue
+from sixMans.sixMans import SixMans
+from sixMans.strings import Strings
+from sixMans.timeouts import TimeoutScheduler
+
+ids = itertools.count(1)
+
+class FakeMessage:
+    def __init__(self):
+        self.id = next(ids)
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def edit(self, **kwargs):
+        pass
+
+class FakeChannel:
+    def __init__(self, guild, name):
+        self.id = next(ids)
+        self.guild = guild
+        self.name = name
+        self.mention = "#{}".format(name)
+        self.members = []
+        self.last_message_id = None
+
+    async def send(self, content=None, embed=None):
+        await self.guild.api_call()
+        message = FakeMessage()
+        self.last_message_id = message.id
+        return message
+
+    async def set_permissions(self, target, **permissions):
+        await self.guild.api_call()
+
+class FakeGuild:
+    def __init__(self, latency, fail_rate):
+        self.id = next(ids)
+        self.name = "Benchmark"
+        self.icon_url = ""
+        self.default_role = object()
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.api_calls = 0
+
+    async def api_call(self):
+        self.api_calls += 1
+        await asyncio.sleep(random.uniform(0, 2 * self.latency))
+
+    async def create_text_channel(self, name, **kwargs):
+        await self.api_call()
+        if random.random() < self.fail_rate:
+            raise RuntimeError("Simulated channel creation failure")
+        return FakeChannel(self, name)
+
+    async def create_voice_channel(self, name, **kwargs):
+        await self.api_call()
+        return FakeChannel(self, name)
+
+    def get_role(self, role_id):
+        return None
+
+    def get_channel(self, channel_id):
+        return None
+
+class FakeMember:
+    def __init__(self, guild, number):
+        self.id = next(ids)
+        self.guild = guild
+        self.display_name = "Player {}".format(number)
+        self.mention = "@{}".format(self.display_name)
+        self.avatar_url = ""
+
+    async def send(self, *args, **kwargs):
+        pass
+
+class FakeContext:
+    prefix = "?"
+
+    def __init__(self, guild, channel, author):
+        self.guild = guild
+        self.channel = channel
+        self.message = type("FakeCommandMessage", (), {"author": author})()
+
+    async def send(self, *args, **kwargs):
+        await self.guild.api_call()
+
+def make_cog(guild):
+    """A SixMans cog with just the state the queue command uses, without a bot or Config behind it."""
+    cog = object.__new__(SixMans)
+    cog.queues = {guild: []}
+    cog.games = {guild: []}
+    cog.queues_enabled = {guild: True}
+    cog.player_timeout_time = {guild: 14400}
+    cog.channel_queues = {}
+    cog.channel_games = {}
+    cog.player_games = {}
+    cog.player_queues = {}
+    cog.observers = set()
+    cog.timeouts = TimeoutScheduler(cog._auto_remove_from_queue)
+
+    async def setting(guild):
+        return None
+    cog._helper_role = cog._get_automove = cog._is_react_to_vote = cog._category = setting
+
+    async def save_game(guild, game):
+        pass
+    cog._save_game = save_game
+    return cog
+
+async def run(joins, queue_count, size, latency, fail_rate):
+    guild = FakeGuild(latency, fail_rate)
+    cog = make_cog(guild)
+    for i in range(queue_count):
+        six_mans_queue = SixMansQueue("Queue {}".format(i), guild, [FakeChannel(guild, "queue-{}".format(i))], {}, {}, 0, size,
+            teamSelection=Strings.SELF_PICKING_TS)
+        six_mans_queue.status = StatusBroadcaster(six_mans_queue, cog.embed_queue_status, latency)
+        cog.queues[guild].append(six_mans_queue)
+        cog._index_queue_channels(six_mans_queue)
+
+    players = [FakeMember(guild, i) for i in range(max(joins // 2, size))]
+    failed_games = []
+    create_game = cog._create_game
+
+    async def record_failure(guild, game):
+        try:
+            await create_game(guild, game)
+        except Exception:
+            failed_games.append(game)
+            raise
+    cog._create_game = record_failure
+
+    join_times = []
+    async def join(ctx):
+        started = time.perf_counter()
+        try:
+            await SixMans.queue.callback(cog, ctx)
+        except RuntimeError:
+            pass    # Simulated failure, the players are checked below
+        join_times.append(time.perf_counter() - started)
+
+    attempts = [FakeContext(guild, random.choice(cog.queues[guild]).channels[0], random.choice(players)) for _ in range(joins)]
+    started = time.perf_counter()
+    await asyncio.gather(*[join(ctx) for ctx in attempts])
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(2 * latency)    # Lets the last status updates go out
+    cog.timeouts.close()
+
+    games = cog.games[guild]
+    in_games = [player for game in games for player in game.players]
+    queued = {player for six_mans_queue in cog.queues[guild] for player in six_mans_queue.queue}
+    returned = {player for game in failed_games for player in game.players}
+    problems = {
+        "games without {} players".format(size): sum(1 for game in games if len(game.players) != size),
+        "players in two games": len(in_games) - len(set(in_games)),
+        "game players still queued": len(queued & set(in_games)),
+        "failed game players not back in queue": len(returned - queued - set(in_games)),
+        "full queues left without a game": 0 if fail_rate else sum(q._queue_full() for q in cog.queues[guild])
+    }
+    join_times.sort()
+    print("{} joins, {} queues of {}: {} games ({} failed) in {:.2f}s, {} API calls, join time median {:.1f}ms p99 {:.1f}ms".format(
+        joins, queue_count, size, len(games), len(failed_games), elapsed, guild.api_calls,
+        statistics.median(join_times) * 1000, join_times[int(len(join_times) * 0.99)] * 1000))
+    for problem, count in problems.items():
+        if count:
+            print("  FAILED: {} {}".format(count, problem))
+    return not any(problems.values())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--joins", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--queues", type=int, default=4)
+    parser.add_argument("--size", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.01, help="Average seconds per Discord API call")
+    parser.add_argument("--fail-rate", type=float, default=0, help="Fraction of games whose channels fail to be created")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    passed = all([asyncio.run(run(joins, args.queues, args.size, args.latency, args.fail_rate)) for joins in args.joins])
+    sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import gzip
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+from pathlib import Path
+
+from .strings import Strings
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class ScoreArchive:
+    """Compressed cold storage for compacted scores: one gzipped JSON lines file per archived segment.
+
+    Methods do blocking file IO and should be run in an executor.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def write_segment(self, guild_id, index, scores):
+        segment_path = self._segment_path(guild_id, index)
+        segment_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = segment_path.with_suffix(".tmp")
+        with gzip.open(temp_path, "wt", encoding="utf-8") as segment_file:
+            for score in scores:
+                segment_file.write(json.dumps(score))
+                segment_file.write("\n")
+        temp_path.replace(segment_path)
+        return segment_path
+
+    def remove_segment(self, guild_id, index):
+        segment_path = self._segment_path(guild_id, index)
+        if segment_path.exists():
+            segment_path.unlink()
+
+    def iter_scores(self, guild_id):
+        """Yields archived scores from oldest to newest, reading one segment file at a time."""
+        for segment_path in sorted(self._guild_path(guild_id).glob("scores-*.jsonl.gz")):
+            with gzip.open(segment_path, "rt", encoding="utf-8") as segment_file:
+                for line in segment_file:
+                    yield json.loads(line)
+
+    def records(self, guild_id):
+        return ScoreRecordFile(self._guild_path(guild_id) / "scores.bin")
+
+    def clear(self, guild_id):
+        shutil.rmtree(self._guild_path(guild_id), ignore_errors=True)
+
+    def _guild_path(self, guild_id):
+        return self.path / str(guild_id)
+
+    def _segment_path(self, guild_id, index):
+        return self._guild_path(guild_id) / "scores-{:06d}.jsonl.gz".format(index)
+
+
+RECORD = struct.Struct("<qQQQqib3x")    # timestamp, queue id (high, low), game id (low), player, points, win
+if numpy is not None:
+    RECORD_DTYPE = numpy.dtype([
+        ("timestamp", "<i8"), ("queue_high", "<u8"), ("queue_low", "<u8"), ("game", "<u8"),
+        ("player", "<i8"), ("points", "<i4"), ("win", "i1"), ("pad", "V3")
+    ])
+
+class ScoreRecordFile:
+    """Fixed-width binary records of archived scores, in time order, scanned through a read-only memory map.
+
+    Window queries binary search the timestamps and only touch the pages from the window start onwards,
+    so archived history is never loaded into Python objects as a whole.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+        self._map = None
+        self._lock = threading.Lock()     # Appends and queries run in executor threads
+
+    def __len__(self):
+        return self.path.stat().st_size // RECORD.size if self.path.exists() else 0
+
+    def append(self, scores, timestamps):
+        with self._lock:
+            self._append(scores, timestamps)
+
+    def window(self, start_ts, queue_id=None):
+        """Player totals and games played for all archived scores at or after start_ts."""
+        with self._lock:
+            return self._window(start_ts, queue_id)
+
+    def scores(self, start_ts):
+        """(timestamp, score) for every archived score at or after start_ts, oldest first. Game ids only keep their low
+        64 bits, which is enough to tell games apart."""
+        with self._lock:
+            records = self._records()
+            if records is None:
+                return []
+            start = self._bisect(records, start_ts)
+            return [
+                (timestamp, {"Game": game, "Queue": queue_high << 64 | queue_low, "Player": player, "Points": points, "Win": win})
+                for timestamp, queue_high, queue_low, game, player, points, win in RECORD.iter_unpack(records[start * RECORD.size:])
+            ]
+
+    def truncate(self, count):
+        """Drops any records after the first count, e.g. ones appended by an interrupted compaction."""
+        with self._lock:
+            self.close()
+            if self.path.exists() and self.path.stat().st_size > count * RECORD.size:
+                os.truncate(self.path, count * RECORD.size)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = self._file = None
+
+    def _append(self, scores, timestamps):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.close()
+        if self.path.exists() and self.path.stat().st_size % RECORD.size:
+            os.truncate(self.path, len(self) * RECORD.size)     # Drops a partial record so new ones stay aligned
+        with open(self.path, "ab") as record_file:
+            for score, timestamp in zip(scores, timestamps):
+                queue_id = int(score["Queue"])
+                record_file.write(RECORD.pack(
+                    int(timestamp), queue_id >> 64, queue_id & 0xFFFFFFFFFFFFFFFF, int(score["Game"]) & 0xFFFFFFFFFFFFFFFF,
+                    score["Player"], score["Points"], score["Win"]
+                ))
+        self.close()    # The map is reopened with the new size on the next query
+
+    def _window(self, start_ts, queue_id):
+        records = self._records()
+        if records is None:
+            return {}, 0
+        start = self._bisect(records, start_ts)
+        if numpy is not None:
+            return self._numpy_window(records, start, queue_id)
+
+        players = {}
+        games = set()
+        for timestamp, queue_high, queue_low, game, player, points, win in RECORD.iter_unpack(records[start * RECORD.size:]):
+            if queue_id is not None and (queue_high << 64 | queue_low) != queue_id:
+                continue
+            games.add(game)
+            player_dict = players.setdefault(str(player), {Strings.PLAYER_POINTS_KEY: 0, Strings.PLAYER_GP_KEY: 0, Strings.PLAYER_WINS_KEY: 0})
+            player_dict[Strings.PLAYER_POINTS_KEY] += points
+            player_dict[Strings.PLAYER_GP_KEY] += 1
+            player_dict[Strings.PLAYER_WINS_KEY] += win
+        return players, len(games)
+
+    def _numpy_window(self, records, start, queue_id):
+        columns = numpy.frombuffer(records, dtype=RECORD_DTYPE, offset=start * RECORD.size)
+        if queue_id is not None:
+            columns = columns[(columns["queue_high"] == queue_id >> 64) & (columns["queue_low"] == queue_id & 0xFFFFFFFFFFFFFFFF)]
+        if not len(columns):
+            return {}, 0
+
+        player_ids, inverse = numpy.unique(columns["player"], return_inverse=True)
+        points = numpy.bincount(inverse, weights=columns["points"]).astype(numpy.int64).tolist()
+        games_played = numpy.bincount(inverse).tolist()
+        wins = numpy.bincount(inverse, weights=columns["win"]).astype(numpy.int64).tolist()
+        players = {
+            str(player): {
+                Strings.PLAYER_POINTS_KEY: points[i],
+                Strings.PLAYER_GP_KEY: games_played[i],
+                Strings.PLAYER_WINS_KEY: wins[i]
+            } for i, player in enumerate(player_ids.tolist())
+        }
+        return players, int(numpy.unique(columns["game"]).size)
+
+    def _records(self):
+        if self._map is None:
+            if not len(self):
+                return None
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        # A record only partly written before a crash is left out, so the scans only see whole records
+        size = len(self._map)
+        return memoryview(self._map)[:size - size % RECORD.size]
+
+    def _bisect(self, records, start_ts):
+        low, high = 0, len(records) // RECORD.size
+        while low < high:
+            middle = (low + high) // 2
+            if struct.unpack_from("<q", records, middle * RECORD.size)[0] < start_ts:
+                low = middle + 1
+            else:
+                high = middle
+        return low
@@ -0,0 +1,74 @@
+import asyncio
+
+import discord
+
+from .queue import fan_out
+
+class StatusBroadcaster:
+    """Coalesces a queue's joins and leaves into one status message per queue channel.
+
+    Changes are gathered for delay seconds after the first one, then a single embed from render(queue, added, removed)
+    is posted. While the status message is still the newest message in a channel it is edited instead of sending a new one.
+    """
+    def __init__(self, queue, render, delay):
+        self.queue = queue
+        self.render = render
+        self.delay = delay
+        self.changes = {}       # player -> True if added, False if removed, since the last update
+        self.messages = {}      # channel id -> the last status message sent to the channel
+        self.task: asyncio.Task = None
+
+    def player_added(self, player):
+        self._change(player, True)
+
+    def player_removed(self, player):
+        self._change(player, False)
+
+    def discard(self):
+        """Drops the pending changes, for when a newer message (e.g. the queue popping) makes them stale."""
+        self.changes = {}
+        self.cancel()
+
+    def cancel(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def flush(self):
+        changes, self.changes = self.changes, {}
+        if not changes:
+            return
+        added = [player for player, was_added in changes.items() if was_added]
+        removed = [player for player, was_added in changes.items() if not was_added]
+        embed = self.render(self.queue, added, removed)
+
+        async def update(channel):
+            message = self.messages.get(channel.id)
+            if message and channel.last_message_id == message.id:
+                try:
+                    await message.edit(embed=embed)
+                    return message
+                except discord.NotFound:
+                    pass
+            return await channel.send(embed=embed)
+
+        channels = list(self.queue.channels)
+        for channel, result in zip(channels, await fan_out(channels, update)):
+            if isinstance(result, Exception):
+                self.messages.pop(channel.id, None)
+            else:
+                self.messages[channel.id] = result
+
+    def _change(self, player, added):
+        # A join and leave within the same update cancel out
+        if self.changes.get(player, added) != added:
+            del self.changes[player]
+        else:
+            self.changes[player] = added
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._update())
+
+    async def _update(self):
+        await asyncio.sleep(self.delay)
+        self.task = None
+        await self.flush()
@@ -0,0 +1,44 @@
+import weakref
+from collections import OrderedDict
+
+import discord
+
+class EmbedCache:
+    """Least recently used cache of rendered leaderboard and rank embeds.
+
+    Each embed is stored with the standings it was rendered from and their version, so it is only served until a finished
+    game or an expiring window changes those standings. The standings are only weakly referenced: once they are replaced
+    and dropped everywhere else, their embeds are dropped too.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()    # key -> (weak reference to the standings, version, embed dict)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, standings):
+        entry = self.entries.get(key)
+        if entry and entry[0]() is standings and entry[1] == standings.version:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return discord.Embed.from_dict(entry[2])
+        self.misses += 1
+        return None
+
+    def put(self, key, standings, embed: discord.Embed):
+        standings_ref = weakref.ref(standings, lambda standings_ref: self._discard(key, standings_ref))
+        self.entries[key] = (standings_ref, standings.version, embed.to_dict())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def _discard(self, key, standings_ref):
+        entry = self.entries.get(key)
+        if entry and entry[0] is standings_ref:
+            del self.entries[key]
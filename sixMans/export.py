@@ -0,0 +1,43 @@
+import csv
+import json
+from pathlib import Path
+
+EXPORT_FORMATS = ["csv", "jsonl"]
+SCORE_FIELDS = ["Game", "Queue", "Player", "Win", "Points", "DateTime", "Timestamp"]
+PLAYER_FIELDS = ["Queue", "Player", "Points", "GamesPlayed", "Wins"]
+
+class ExportWriter:
+    """Writes rows to a CSV or JSON lines file as they come, so an export only holds the batch being written in memory.
+
+    Methods do blocking file IO and should be run in an executor.
+    """
+    def __init__(self, path, file_format, fields):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file_format = file_format
+        self.rows = 0
+        self._file = open(self.path, "w", encoding="utf-8", newline="")
+        if file_format == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=fields, extrasaction="ignore")
+            self._csv.writeheader()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, row):
+        if self.file_format == "csv":
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps(row))
+            self._file.write("\n")
+        self.rows += 1
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def close(self):
+        self._file.close()
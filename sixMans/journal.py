@@ -0,0 +1,130 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+
+JOIN = "J"
+LEAVE = "L"
+COMPACT_LINES = 10000   # Entries written before the journal is compacted down to the players still queued
+
+class QueueJournal:
+    """Append-only log of queue joins and leaves for one guild, replayed on load to restore the queues after a restart.
+
+    Entries are written to the file straight away and synced to disk in the executor, with every entry written while a
+    sync is running covered by the next one, so joins and leaves never wait on the disk. Once COMPACT_LINES entries have
+    been written the journal is rewritten in the background with just the players still queued.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.queues = {}        # queue_id -> {player_id: joined_at} for everyone still queued, as last written
+        self.lines = 0          # Entries in the file
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        self._unsynced = False
+        self._sync_task: asyncio.Task = None
+        self._compact_task: asyncio.Task = None
+        self._since_compaction = None   # Lines written while a compaction is running, added to the compacted file
+
+    def join(self, queue_id, player_id, joined_at):
+        self.queues.setdefault(queue_id, {})[player_id] = joined_at
+        self._write({"Op": JOIN, "Queue": queue_id, "Player": player_id, "Time": joined_at})
+
+    def leave(self, queue_id, player_id):
+        players = self.queues.get(queue_id, {})
+        players.pop(player_id, None)
+        if not players:
+            self.queues.pop(queue_id, None)
+        self._write({"Op": LEAVE, "Queue": queue_id, "Player": player_id})
+
+    def replay(self):
+        """Returns {queue_id: {player_id: joined_at}} for everyone still queued, in the order they joined."""
+        queues = {}
+        with open(self.path, "r", encoding="utf-8") as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue    # A partial last line from a crash mid-write
+                players = queues.setdefault(entry["Queue"], {})
+                if entry["Op"] == JOIN:
+                    players[entry["Player"]] = entry["Time"]
+                else:
+                    players.pop(entry["Player"], None)
+        return {queue_id: players for queue_id, players in queues.items() if players}
+
+    def rewrite(self, queues):
+        """Replaces the journal with join entries for the given {queue_id: {player_id: joined_at}} state."""
+        self._cancel_compaction()
+        self.queues = {queue_id: dict(players) for queue_id, players in queues.items() if players}
+        os.close(self._fd)
+        self._fd = self._write_compacted(self.queues)
+        self.lines = sum(len(players) for players in self.queues.values())
+
+    def close(self):
+        self._cancel_compaction()
+        if self._sync_task:
+            self._sync_task.cancel()
+        os.fsync(self._fd)
+        os.close(self._fd)
+
+    def _write(self, entry):
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        os.write(self._fd, line)
+        self.lines += 1
+        if self._since_compaction is not None:
+            self._since_compaction.append(line)
+        self._unsynced = True
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync())
+        if self.lines >= COMPACT_LINES and (self._compact_task is None or self._compact_task.done()):
+            self._compact_task = asyncio.create_task(self._compact())
+
+    async def _sync(self):
+        loop = asyncio.get_event_loop()
+        while self._unsynced:
+            self._unsynced = False
+            await loop.run_in_executor(None, os.fsync, self._fd)
+
+    async def _compact(self):
+        """Rewrites the journal with the players still queued, without blocking joins and leaves while it is written."""
+        snapshot = {queue_id: dict(players) for queue_id, players in self.queues.items()}
+        self._since_compaction = []
+        fd = await asyncio.get_event_loop().run_in_executor(None, self._write_compacted, snapshot, False)
+        # Nothing below awaits, so no entries are written between copying the ones made meanwhile and switching files
+        lines, self._since_compaction = self._since_compaction, None
+        for line in lines:
+            os.write(fd, line)
+        os.replace(self._temp_path(), self.path)
+        old_fd, self._fd = self._fd, fd
+        self.lines = sum(len(players) for players in snapshot.values()) + len(lines)
+        self._unsynced = True
+        try:
+            if self._sync_task is None or self._sync_task.done():
+                self._sync_task = asyncio.create_task(self._sync())
+            else:
+                # A sync of the old file may still be running in the executor. The task syncs the new file after it
+                await asyncio.wait([self._sync_task])
+        finally:
+            os.close(old_fd)
+
+    def _write_compacted(self, queues, replace=True):
+        """Writes and syncs a journal file with join entries for queues. Returns a descriptor for appending to it."""
+        temp_path = self._temp_path()
+        with open(temp_path, "w", encoding="utf-8") as journal_file:
+            for queue_id, players in queues.items():
+                for player_id, joined_at in players.items():
+                    journal_file.write(json.dumps({"Op": JOIN, "Queue": queue_id, "Player": player_id, "Time": joined_at}) + "\n")
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        fd = os.open(temp_path, os.O_WRONLY | os.O_APPEND)
+        if replace:
+            os.replace(temp_path, self.path)
+        return fd
+
+    def _temp_path(self):
+        return self.path.with_suffix(".tmp")
+
+    def _cancel_compaction(self):
+        if self._compact_task:
+            self._compact_task.cancel()
+        self._since_compaction = None
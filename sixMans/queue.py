@@ -1,13 +1,14 @@
-import collections
+import asyncio
 import datetime
 import uuid
 import struct
-from queue import Queue
 from typing import List
 from .strings import Strings
 
 import discord
 
+SEND_CONCURRENCY = 4    # Queue channels sent to at the same time
+
 SELECTION_MODES = {
     0x1F3B2: Strings.RANDOM_TS,         # game_die
     0x1F1E8: Strings.CAPTAINS_TS,       # C
@@ -21,29 +22,37 @@ class SixMansQueue:
         points, players, gamesPlayed, maxSize, teamSelection=Strings.RANDOM_TS, category: discord.CategoryChannel=None, lobby_vc: discord.VoiceChannel=None):
         self.id = uuid.uuid4().int
         self.name = name
-        self.queue = PlayerQueue()
+        self.queue = PlayerQueue(maxSize)
         self.guild = guild
         self.channels = channels
         self.points = points
         self.players = players
         self.gamesPlayed = gamesPlayed
-        self.maxSize = maxSize
         self.teamSelection = teamSelection
         self.category = category
         self.lobby_vc = lobby_vc
         self.activeJoinLog = {}
-        # TODO: active join log could maintain queue during downtime
+        self.journal = None     # QueueJournal that joins and leaves are written to, so the queue survives restarts
+        self.lock = asyncio.Lock()  # Held while players are added to the queue or taken from it for a game
+        self.status = None      # StatusBroadcaster that joins and leaves are announced through
+
+    @property
+    def maxSize(self):
+        return self.queue.max_size
 
-    def _put(self, player):
-        self.queue.put(player)
-        # self.activeJoinLog[player.id] = datetime.datetime.now()
+    @maxSize.setter
+    def maxSize(self, max_size):
+        self.queue.set_max_size(max_size)
+
+    def _put(self, player, joined_at=None, front=False):
+        self.queue.put(player, front)
+        self.activeJoinLog[player.id] = joined_at if joined_at else datetime.datetime.now().timestamp()
+        if self.journal:
+            self.journal.join(self.id, player.id, self.activeJoinLog[player.id])
 
     def _get(self):
         player = self.queue.get()
-        try:
-            del self.activeJoinLog[player.id]
-        except:
-            pass
+        self._forget(player)
         return player
 
     def get_player_summary(self, player: discord.User):
@@ -53,20 +62,24 @@ class SixMansQueue:
             return None
 
     def _remove(self, player):
-        self.queue._remove(player)
+        self.queue.remove(player)
+        self._forget(player)
+
+    def _forget(self, player):
         try:
             del self.activeJoinLog[player.id]
         except:
             pass
+        if self.journal:
+            self.journal.leave(self.id, player.id)
 
     def _queue_full(self):
-        return self.queue.qsize() >= self.maxSize
+        return self.queue.full()
 
     async def send_message(self, message='', embed=None):
-        messages = []
-        for channel in self.channels:
-            messages.append(await channel.send(message, embed=embed))
-        return messages
+        """Sends to all of the queue's channels concurrently. Returns the sent messages in channel order, with the exception
+        in place of the message for any channel it couldn't be sent to."""
+        return await fan_out(self.channels, lambda channel: channel.send(message, embed=embed))
 
     async def set_team_selection(self, team_selection):
         self.teamSelection = team_selection
@@ -107,70 +120,85 @@ class SixMansQueue:
         
         return q_data
 
-class PlayerQueue(Queue):
-    def _init(self, maxsize):
-        self.queue = OrderedSet()
+async def fan_out(channels, send, limit=SEND_CONCURRENCY):
+    """Awaits send(channel) for every channel, at most limit at a time, and returns the results in channel order.
 
-    def _put(self, item):
-        self.queue.add(item)
+    A channel that fails with a Discord error (e.g. it was deleted) gets the exception as its result without stopping the
+    sends to the other channels.
+    """
+    semaphore = asyncio.Semaphore(limit)
 
-    def _get(self):
-        return self.queue.pop()
+    async def send_to(channel):
+        async with semaphore:
+            try:
+                return await send(channel)
+            except discord.HTTPException as error:
+                return error
 
-    def _remove(self, value):
-        self.queue.remove(value)
+    return await asyncio.gather(*[send_to(channel) for channel in channels])
 
-    def __contains__(self, item):
-        with self.mutex:
-            return item in self.queue
+class PlayerQueue:
+    """First in, first out queue of players for use on the event loop, without the thread locking of queue.Queue.
 
+    Adding, removing, membership checks and taking the longest waiting player are all O(1).
+    """
+    __slots__ = ("max_size", "_entries", "_end")
 
-class OrderedSet(collections.abc.MutableSet):
-    def __init__(self, iterable=None):
-        self.end = end = []
-        end += [None, end, end]  # sentinel node for doubly linked list
-        self.map = {}  # key --> [key, prev, next]
-        if iterable is not None:
-            self |= iterable
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = {}                  # player -> _Entry
+        self._end = _Entry(None)            # Sentinel of the circular linked list, _end.next is the front
+        self._end.prev = self._end.next = self._end
 
     def __len__(self):
-        return len(self.map)
+        return len(self._entries)
 
-    def __contains__(self, key):
-        return key in self.map
+    def __contains__(self, player):
+        return player in self._entries
 
-    def add(self, key):
-        if key not in self.map:
-            end = self.end
-            curr = end[1]
-            curr[2] = end[1] = self.map[key] = [key, curr, end]
+    def __iter__(self):
+        entry = self._end.next
+        while entry is not self._end:
+            yield entry.player
+            entry = entry.next
+
+    def qsize(self):
+        return len(self._entries)
+
+    def full(self):
+        return len(self._entries) >= self.max_size
+
+    def put(self, player, front=False):
+        """Adds the player to the back of the queue, or the front if front is set. Players already in the queue keep their place."""
+        if player in self._entries:
+            return
+        entry = self._entries[player] = _Entry(player)
+        if front:
+            entry.prev, entry.next = self._end, self._end.next
+        else:
+            entry.prev, entry.next = self._end.prev, self._end
+        entry.prev.next = entry
+        entry.next.prev = entry
+
+    def get(self):
+        """Removes and returns the player who has waited the longest."""
+        if not self._entries:
+            raise IndexError("get from an empty queue")
+        player = self._end.next.player
+        self.remove(player)
+        return player
 
-    def discard(self, key):
-        if key in self.map:
-            key, prev, next = self.map.pop(key)
-            prev[2] = next
-            next[1] = prev
+    def remove(self, player):
+        entry = self._entries.pop(player)
+        entry.prev.next = entry.next
+        entry.next.prev = entry.prev
 
-    def __iter__(self):
-        end = self.end
-        curr = end[2]
-        while curr is not end:
-            yield curr[0]
-            curr = curr[2]
-
-    def __reversed__(self):
-        end = self.end
-        curr = end[1]
-        while curr is not end:
-            yield curr[0]
-            curr = curr[1]
-
-    def __repr__(self):
-        if not self:
-            return '%s()' % (self.__class__.__name__,)
-        return '%s(%r)' % (self.__class__.__name__, list(self))
-
-    def __eq__(self, other):
-        if isinstance(other, OrderedSet):
-            return len(self) == len(other) and list(self) == list(other)
-        return set(self) == set(other)
+    def set_max_size(self, max_size):
+        self.max_size = max_size
+
+class _Entry:
+    __slots__ = ("player", "prev", "next")
+
+    def __init__(self, player):
+        self.player = player
+        self.prev = self.next = None
@@ -0,0 +1,205 @@
+import random
+
+from .strings import Strings
+
+MAX_LEVELS = 24     # Enough for millions of entries
+
+class _Infinity:
+    """Value of the skip list's tail node, greater than everything."""
+    def __lt__(self, other):
+        return False
+
+    def __eq__(self, other):
+        return other is self
+
+    def __hash__(self):
+        return 0
+
+class _Node:
+    __slots__ = ("value", "next", "width")
+
+    def __init__(self, value, levels):
+        self.value = value
+        self.next = [None] * levels
+        self.width = [1] * levels   # Number of positions jumped by following next at each level
+
+class IndexableSkiplist:
+    """Sorted sequence of unique values with O(log n) insert, remove, position lookup and indexed access."""
+    def __init__(self):
+        self.size = 0
+        self.tail = _Node(_Infinity(), 0)
+        self.head = _Node(None, MAX_LEVELS)
+        self.head.next = [self.tail] * MAX_LEVELS
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        return self._node_at(index).value
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def insert(self, value):
+        chain = [None] * MAX_LEVELS
+        steps_at_level = [0] * MAX_LEVELS
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level].value < value:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        levels = 1
+        while levels < MAX_LEVELS and random.random() < 0.5:
+            levels += 1
+        new_node = _Node(value, levels)
+        steps = 0
+        for level in range(levels):
+            previous = chain[level]
+            new_node.next[level] = previous.next[level]
+            previous.next[level] = new_node
+            new_node.width[level] = previous.width[level] - steps
+            previous.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, MAX_LEVELS):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, value):
+        chain = [None] * MAX_LEVELS
+        node = self.head
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        removed = chain[0].next[0]
+        if removed is self.tail or removed.value != value:
+            raise KeyError(value)
+
+        for level in range(len(removed.next)):
+            previous = chain[level]
+            previous.width[level] += removed.width[level] - 1
+            previous.next[level] = removed.next[level]
+        for level in range(len(removed.next), MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def index(self, value):
+        """Zero-based position of value."""
+        node = self.head
+        position = 0
+        for level in reversed(range(MAX_LEVELS)):
+            while node.next[level].value < value:
+                position += node.width[level]
+                node = node.next[level]
+        if node.next[0] is self.tail or node.next[0].value != value:
+            raise ValueError(value)
+        return position
+
+    def iter_from(self, index):
+        if index >= self.size:
+            return
+        node = self._node_at(index)
+        while node is not self.tail:
+            yield node.value
+            node = node.next[0]
+
+    def _node_at(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        node = self.head
+        index += 1
+        for level in reversed(range(MAX_LEVELS)):
+            while node.width[level] <= index:
+                index -= node.width[level]
+                node = node.next[level]
+        return node
+
+WIN_PERCENTAGE = "WinPercentage"
+
+def win_percentage(stats):
+    games_played = stats[Strings.PLAYER_GP_KEY]
+    return stats[Strings.PLAYER_WINS_KEY] / games_played if games_played else 0
+
+class Standings:
+    """Players ranked by points, wins, games played and win percentage, kept sorted as stats change.
+
+    The standings order is points then wins (both descending). Updating a player, finding a player's rank in any metric
+    and reading any page of the standings are O(log n).
+    """
+    def __init__(self, players=None):
+        self.players = {}       # player id -> {"Points", "GamesPlayed", "Wins"}
+        self.version = 0        # Incremented on every change, so views built from the standings know when to rebuild
+        self._ranked = {metric: IndexableSkiplist() for metric in self._keys}
+        for player_id, stats in (players or {}).items():
+            self.set(player_id, stats)
+
+    def __len__(self):
+        return len(self.players)
+
+    def __iter__(self):
+        return self.items()
+
+    def set(self, player_id, stats):
+        player_id = str(player_id)
+        if player_id in self.players:
+            for metric, key in self._keys.items():
+                self._ranked[metric].remove(key(player_id, self.players[player_id]))
+        stats = self.players[player_id] = {
+            Strings.PLAYER_POINTS_KEY: stats.get(Strings.PLAYER_POINTS_KEY, 0),
+            Strings.PLAYER_GP_KEY: stats.get(Strings.PLAYER_GP_KEY, 0),
+            Strings.PLAYER_WINS_KEY: stats.get(Strings.PLAYER_WINS_KEY, 0)
+        }
+        for metric, key in self._keys.items():
+            self._ranked[metric].insert(key(player_id, stats))
+        self.version += 1
+
+    def add_score(self, score):
+        """Adds a single score to the player's stats, the same way SixMans._give_points does."""
+        stats = dict(self.players.get(str(score["Player"]), {}))
+        stats[Strings.PLAYER_POINTS_KEY] = stats.get(Strings.PLAYER_POINTS_KEY, 0) + score["Points"]
+        stats[Strings.PLAYER_GP_KEY] = stats.get(Strings.PLAYER_GP_KEY, 0) + 1
+        stats[Strings.PLAYER_WINS_KEY] = stats.get(Strings.PLAYER_WINS_KEY, 0) + score["Win"]
+        self.set(score["Player"], stats)
+
+    def remove_score(self, score):
+        """Takes a single score back out of the player's stats, dropping the player once they have no games left."""
+        player_id = str(score["Player"])
+        stats = dict(self.players[player_id])
+        stats[Strings.PLAYER_POINTS_KEY] -= score["Points"]
+        stats[Strings.PLAYER_GP_KEY] -= 1
+        stats[Strings.PLAYER_WINS_KEY] -= score["Win"]
+        if stats[Strings.PLAYER_GP_KEY] > 0:
+            self.set(player_id, stats)
+        else:
+            self.discard(player_id)
+
+    def discard(self, player_id):
+        player_id = str(player_id)
+        stats = self.players.pop(player_id, None)
+        if stats is not None:
+            for metric, key in self._keys.items():
+                self._ranked[metric].remove(key(player_id, stats))
+            self.version += 1
+
+    def rank(self, player_id, metric=Strings.PLAYER_POINTS_KEY):
+        """Zero-based rank of the player in the metric, or None if they have no stats."""
+        player_id = str(player_id)
+        if player_id not in self.players:
+            return None
+        return self._ranked[metric].index(self._keys[metric](player_id, self.players[player_id]))
+
+    def items(self, start=0):
+        """Yields (player id, stats) in standings order, starting at rank start."""
+        for key in self._ranked[Strings.PLAYER_POINTS_KEY].iter_from(start):
+            yield key[-1], self.players[key[-1]]
+
+    _keys = {
+        Strings.PLAYER_POINTS_KEY: lambda player_id, stats: (-stats[Strings.PLAYER_POINTS_KEY], -stats[Strings.PLAYER_WINS_KEY], player_id),
+        Strings.PLAYER_WINS_KEY: lambda player_id, stats: (-stats[Strings.PLAYER_WINS_KEY], player_id),
+        Strings.PLAYER_GP_KEY: lambda player_id, stats: (-stats[Strings.PLAYER_GP_KEY], player_id),
+        WIN_PERCENTAGE: lambda player_id, stats: (-win_percentage(stats), player_id)
+    }
@@ -0,0 +1,96 @@
+from .strings import Strings
+
+HOUR = 3600
+DAY = 86400
+
+class ScoreRollups:
+    """Per-hour and per-day totals of points, wins and games played for each player in each queue.
+
+    Buckets are keyed by "H<epoch hour>" or "D<epoch day>" and look like:
+    {"Queues": {queue_id: {"GamesPlayed": int, "Players": {player_id: {"Points", "GamesPlayed", "Wins"}}}}}
+    """
+    def __init__(self, buckets=None):
+        self.buckets = buckets if buckets else {}
+        self.hour_floor = 0     # Hour buckets before this epoch hour have been pruned
+
+    def add_game(self, queue_id, scores, timestamp):
+        """Adds one finished game's scores. Returns the keys of the buckets that changed."""
+        timestamp = int(timestamp)
+        keys = [self._hour_key(timestamp // HOUR), self._day_key(timestamp // DAY)]
+        for key in keys:
+            queue_bucket = self.buckets.setdefault(key, {"Queues": {}})["Queues"].setdefault(str(queue_id), {"GamesPlayed": 0, "Players": {}})
+            queue_bucket["GamesPlayed"] += 1
+            for score in scores:
+                self._add_stats(queue_bucket["Players"], str(score["Player"]), score["Points"], 1, score["Win"])
+        return keys
+
+    def window(self, start_ts, end_ts, queue_id=None):
+        """Totals for all games between start_ts and end_ts, to the hour.
+
+        Where hour buckets have been pruned only the day buckets that fully fit in the window are counted.
+        """
+        totals = self._totals(self._window_keys(int(start_ts), int(end_ts)))
+        if queue_id is not None:
+            queue_totals = totals.get(str(queue_id))
+            return (queue_totals["Players"], queue_totals["GamesPlayed"]) if queue_totals else ({}, 0)
+
+        players = {}
+        games_played = 0
+        for queue_totals in totals.values():
+            games_played += queue_totals["GamesPlayed"]
+            for player_id, stats in queue_totals["Players"].items():
+                self._add_stats(players, player_id, stats[Strings.PLAYER_POINTS_KEY], stats[Strings.PLAYER_GP_KEY], stats[Strings.PLAYER_WINS_KEY])
+        return players, games_played
+
+    def day_totals(self, first_day, end_day):
+        """Totals per queue for every game on the epoch days from first_day up to, but not including, end_day.
+        Day buckets are never pruned, so these are exact however far back the days are."""
+        return self._totals([self._day_key(day) for day in range(first_day, end_day)])
+
+    def prune_hours(self, before_ts):
+        """Removes hour buckets older than before_ts. Returns the removed keys."""
+        before_hour = int(before_ts) // HOUR
+        self.hour_floor = max(self.hour_floor, before_hour)
+        removed = [key for key in self.buckets if key[0] == "H" and int(key[1:]) < before_hour]
+        for key in removed:
+            del self.buckets[key]
+        return removed
+
+    def _totals(self, keys):
+        """{queue_id: {"GamesPlayed": int, "Players": {...}}} summed over the buckets with the given keys."""
+        totals = {}
+        for key in keys:
+            bucket = self.buckets.get(key)
+            if not bucket:
+                continue
+            for queue_id, queue_bucket in bucket["Queues"].items():
+                queue_totals = totals.setdefault(queue_id, {"GamesPlayed": 0, "Players": {}})
+                queue_totals["GamesPlayed"] += queue_bucket["GamesPlayed"]
+                for player_id, stats in queue_bucket["Players"].items():
+                    self._add_stats(queue_totals["Players"], player_id, stats[Strings.PLAYER_POINTS_KEY], stats[Strings.PLAYER_GP_KEY], stats[Strings.PLAYER_WINS_KEY])
+        return totals
+
+    def _window_keys(self, start_ts, end_ts):
+        first_hour = start_ts // HOUR
+        last_hour = end_ts // HOUR
+        first_day = -(-first_hour // 24)
+        last_day = last_hour // 24
+        if first_day >= last_day:
+            return [self._hour_key(hour) for hour in range(first_hour, last_hour + 1)]
+
+        keys = [self._hour_key(hour) for hour in range(max(first_hour, self.hour_floor), first_day * 24)]
+        keys += [self._day_key(day) for day in range(first_day, last_day)]
+        keys += [self._hour_key(hour) for hour in range(last_day * 24, last_hour + 1)]
+        return keys
+
+    def _add_stats(self, players, player_id, points, games_played, wins):
+        player_dict = players.setdefault(player_id, {})
+        player_dict[Strings.PLAYER_POINTS_KEY] = player_dict.get(Strings.PLAYER_POINTS_KEY, 0) + points
+        player_dict[Strings.PLAYER_GP_KEY] = player_dict.get(Strings.PLAYER_GP_KEY, 0) + games_played
+        player_dict[Strings.PLAYER_WINS_KEY] = player_dict.get(Strings.PLAYER_WINS_KEY, 0) + wins
+
+    def _hour_key(self, hour):
+        return "H{}".format(hour)
+
+    def _day_key(self, day):
+        return "D{}".format(day)
@@ -0,0 +1,122 @@
+from array import array
+from bisect import bisect_left
+
+from .strings import Strings
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class ScoreIndex:
+    """Column-oriented, in-memory copy of a guild's score history.
+
+    Parallel arrays hold the timestamp, queue, player, win and points of every score in time order, so window and
+    queue filters are a bisect plus a scan over plain integers. NumPy is used for the scan when it is installed.
+    """
+    def __init__(self, complete=True):
+        self.complete = complete        # False once older scores have been archived and are not in the index
+        self.timestamps = array("q")
+        self.queues = array("l")        # Codes into queue_ids, queue ids are too large for an array
+        self.players = array("q")
+        self.wins = array("b")
+        self.points = array("l")
+        self.game_starts = array("b")   # 1 on the first score of each game
+        self.queue_ids = []
+        self.queue_codes = {}
+        self._loading_games = []
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def load_newest_first(self, score, timestamp):
+        """Adds a score while loading the history, which is read from storage newest to oldest. Call finish_load() after."""
+        self._append(score, timestamp, 0)
+        self._loading_games.append(score["Game"])
+
+    def finish_load(self):
+        for column in self._columns():
+            column.reverse()
+        games = self._loading_games
+        games.reverse()
+        for i, game in enumerate(games):
+            self.game_starts[i] = int(i == 0 or game != games[i - 1])
+        self._loading_games = []
+
+    def append_game(self, scores, timestamp):
+        for i, score in enumerate(scores):
+            self._append(score, timestamp, int(i == 0))
+
+    def covers(self, start_ts):
+        return self.complete or (len(self) and self.timestamps[0] <= start_ts)
+
+    def window(self, start_ts, queue_id=None):
+        """Player totals and games played for all indexed scores at or after start_ts."""
+        start = bisect_left(self.timestamps, start_ts)
+        queue_code = self.queue_codes.get(queue_id, -1) if queue_id is not None else None
+        if numpy is not None:
+            return self._numpy_window(start, queue_code)
+
+        players = {}
+        games_played = 0
+        for queue, player, win, points, game_start in zip(self.queues[start:], self.players[start:], self.wins[start:],
+                self.points[start:], self.game_starts[start:]):
+            if queue_code is not None and queue != queue_code:
+                continue
+            games_played += game_start
+            player_dict = players.get(player)
+            if player_dict is None:
+                player_dict = players[player] = [0, 0, 0]
+            player_dict[0] += points
+            player_dict[1] += 1
+            player_dict[2] += win
+        return self._player_dicts(players.items()), games_played
+
+    def _numpy_window(self, start, queue_code):
+        players = numpy.frombuffer(self.players, dtype=numpy.int64)[start:]
+        wins = numpy.frombuffer(self.wins, dtype=numpy.int8)[start:]
+        points = numpy.frombuffer(self.points, dtype=self._long_dtype())[start:]
+        game_starts = numpy.frombuffer(self.game_starts, dtype=numpy.int8)[start:]
+        if queue_code is not None:
+            mask = numpy.frombuffer(self.queues, dtype=self._long_dtype())[start:] == queue_code
+            players, wins, points, game_starts = players[mask], wins[mask], points[mask], game_starts[mask]
+        if not len(players):
+            return {}, 0
+
+        player_ids, inverse = numpy.unique(players, return_inverse=True)
+        totals = zip(
+            player_ids.tolist(),
+            zip(
+                numpy.bincount(inverse, weights=points).astype(numpy.int64).tolist(),
+                numpy.bincount(inverse).tolist(),
+                numpy.bincount(inverse, weights=wins).astype(numpy.int64).tolist()
+            )
+        )
+        return self._player_dicts(totals), int(game_starts.sum())
+
+    def _player_dicts(self, totals):
+        return {
+            str(player): {
+                Strings.PLAYER_POINTS_KEY: points,
+                Strings.PLAYER_GP_KEY: games_played,
+                Strings.PLAYER_WINS_KEY: wins
+            } for player, (points, games_played, wins) in totals
+        }
+
+    def _append(self, score, timestamp, game_start):
+        queue_code = self.queue_codes.get(score["Queue"])
+        if queue_code is None:
+            queue_code = self.queue_codes[score["Queue"]] = len(self.queue_ids)
+            self.queue_ids.append(score["Queue"])
+        self.timestamps.append(int(timestamp))
+        self.queues.append(queue_code)
+        self.players.append(score["Player"])
+        self.wins.append(score["Win"])
+        self.points.append(score["Points"])
+        self.game_starts.append(game_start)
+
+    def _columns(self):
+        return (self.timestamps, self.queues, self.players, self.wins, self.points, self.game_starts)
+
+    def _long_dtype(self):
+        return numpy.int64 if self.queues.itemsize == 8 else numpy.int32
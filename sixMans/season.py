@@ -0,0 +1,64 @@
+import datetime
+
+from .ranking import Standings
+from .rollups import DAY
+
+class Season:
+    """An admin-defined league season running from the start of its first day to the end of its last day (UTC), with its
+    own standings per queue and guild-wide.
+
+    The standings are loaded from the day rollups and kept up to date as games finish, so a season board never goes
+    back to the score history.
+    """
+    def __init__(self, name, first_day: datetime.date, last_day: datetime.date):
+        self.name = name
+        self.first_day = first_day
+        self.last_day = last_day
+        self.start_ts = _epoch_day(first_day) * DAY
+        self.end_ts = (_epoch_day(last_day) + 1) * DAY
+        self.standings = {None: Standings()}
+        self.games_played = {None: 0}
+
+    def includes(self, timestamp):
+        return self.start_ts <= timestamp < self.end_ts
+
+    def load(self, rollups):
+        """Fills the standings from the rollups' day totals for the season."""
+        self.standings = {None: Standings()}
+        self.games_played = {None: 0}
+        for queue_id, queue_totals in rollups.day_totals(_epoch_day(self.first_day), _epoch_day(self.last_day) + 1).items():
+            queue_id = int(queue_id)
+            self.standings[queue_id] = Standings(queue_totals["Players"])
+            self.games_played[queue_id] = queue_totals["GamesPlayed"]
+            self.games_played[None] += queue_totals["GamesPlayed"]
+            guild_standings = self.standings[None]
+            for player_id, stats in queue_totals["Players"].items():
+                guild_stats = dict(guild_standings.players.get(player_id, {}))
+                for key, value in stats.items():
+                    guild_stats[key] = guild_stats.get(key, 0) + value
+                guild_standings.set(player_id, guild_stats)
+
+    def add_game(self, queue_id, scores, timestamp):
+        if not self.includes(timestamp):
+            return
+        for key in (None, queue_id):
+            standings = self.standings.get(key)
+            if standings is None:
+                standings = self.standings[key] = Standings()
+            for score in scores:
+                standings.add_score(score)
+            self.games_played[key] = self.games_played.get(key, 0) + 1
+
+    def window(self, queue_id=None):
+        """Standings and games played for the queue, or guild-wide if no queue is given."""
+        return self.standings.get(queue_id) or Standings(), self.games_played.get(queue_id, 0)
+
+    def to_dict(self):
+        return {"Start": self.first_day.isoformat(), "End": self.last_day.isoformat()}
+
+    @classmethod
+    def from_dict(cls, name, value):
+        return cls(name, datetime.date.fromisoformat(value["Start"]), datetime.date.fromisoformat(value["End"]))
+
+def _epoch_day(date: datetime.date):
+    return (date - datetime.date(1970, 1, 1)).days
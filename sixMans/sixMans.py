@@ -1,18 +1,34 @@
 import asyncio
 import datetime
+import itertools
 import random
+import re
 from sys import exc_info, maxsize
 from typing import Dict, List
 
 import discord
 from discord.ext.commands import Context
 from redbot.core import Config, checks, commands
+from redbot.core.data_manager import cog_data_path
 from redbot.core.utils.menus import start_adding_reactions
 from redbot.core.utils.predicates import ReactionPredicate
 
+from .embed_cache import EmbedCache
+from .export import EXPORT_FORMATS, PLAYER_FIELDS, SCORE_FIELDS, ExportWriter
 from .game import Game
+from .journal import QueueJournal
 from .queue import SixMansQueue
+from .ranking import WIN_PERCENTAGE, Standings, win_percentage
+from .archive import ScoreArchive, ScoreRecordFile
+from .broadcaster import StatusBroadcaster
+from .rollups import ScoreRollups
+from .season import Season
+from .score_index import ScoreIndex
+from .sliding_window import SlidingWindow
+from .sqlite_store import SQLiteStore
+from .write_behind import WriteBehind
 from .strings import Strings
+from .timeouts import TimeoutScheduler
 
 DEBUG = False
 MINIMUM_GAME_TIME = 60                         # Seconds (10 Minutes)
@@ -20,6 +36,19 @@ PLAYER_TIMEOUT_TIME = 10 if DEBUG else 14400    # How long players can be in a q
 LOOP_TIME = 5                                   # How often to check the queues in seconds
 VERIFY_TIMEOUT = 15                             # How long someone has to react to a prompt (seconds)
 CHANNEL_SLEEP_TIME = 5 if DEBUG else 30         # How long channels will persist after a game's score has been reported (seconds)
+SCORE_SEGMENT_SIZE = 1000                       # How many score rows are stored in each Config segment
+HOURLY_ROLLUP_RETENTION = 31 * 86400            # How long hour resolution leaderboard rollups are kept (seconds)
+WRITE_BEHIND_INTERVAL = 5                       # How long queue, player and game saves are held to be coalesced (seconds)
+SLIDING_WINDOWS = [datetime.timedelta(days=1), datetime.timedelta(weeks=1)]  # Windows kept current in memory as games finish
+WINDOW_STANDINGS_CACHE_TIME = 60                # How long monthly/yearly standings are kept up to date incrementally before a rebuild (seconds)
+LEADERBOARD_PAGE_SIZE = 10                      # Players listed on each leaderboard page
+EMBED_CACHE_SIZE = 256                          # Rendered leaderboard and rank embeds kept per guild
+EXPORT_BATCH_SIZE = 1000                        # Rows read or written per executor call during an export
+STATUS_UPDATE_DELAY = 3                         # How long queue joins and leaves are gathered into one status message (seconds)
+
+# Attribute of the bot holding the final flush of the last unloaded cog. The bot outlives the cog and this module when
+# the cog is reloaded, so the new instance can wait for the old one's saves before reading saved data
+CLOSING_TASK_ATTR = "_six_mans_closing_task"
 
 QTS_METHODS = [
     Strings.VOTE_TS,
@@ -28,6 +57,7 @@ QTS_METHODS = [
     Strings.BALANCED_TS,
     Strings.SELF_PICKING_TS
 ]  # , Strings.SHUFFLE_TS, Strings.BALANCED_TS]
+STORAGE_BACKENDS = ["config", "sqlite"]
 defaults = {
     "CategoryChannel": None,
     "HelperRole": None,
@@ -41,7 +71,15 @@ defaults = {
     "Queues": {},
     "GamesPlayed": 0,
     "Players": {},
-    "Scores": [],
+    "Scores": [],                               # Legacy score list, migrated into ScoreSegment groups on load
+    "ScoreSegments": 0,
+    "ScoreSegmentStart": 0,                     # Segments before this one have been compacted into the archive
+    "ScoreRetentionDays": None,
+    "ArchivedSegments": 0,
+    "PendingCompaction": None,                  # The segment being compacted, finished or rolled back on load after a crash
+    "RollupsBuilt": False,
+    "StorageBackend": "config",
+    "Seasons": {},
     "QueuesEnabled": True
 }
 
@@ -51,21 +89,65 @@ class SixMans(commands.Cog):
         self.bot = bot
         self.config = Config.get_conf(self, identifier=1234567896, force_registration=True)
         self.config.register_guild(**defaults)
+        self.config.init_custom("ScoreSegment", 2)
+        self.config.register_custom("ScoreSegment", Scores=[])
+        self.config.init_custom("ScoreRollup", 2)
+        self.config.register_custom("ScoreRollup", Queues={})
         self.queues: dict[list[SixMansQueue]] = {}
         self.games: dict[list[Game]] = {}
+        self.channel_queues: dict[dict[SixMansQueue]] = {}  # Text channel id -> queue
+        self.channel_games: dict[dict[Game]] = {}           # Text channel id -> active game
+        self.player_games: dict[dict[Game]] = {}            # Player id -> active game
+        self.player_queues: dict[dict[set]] = {}            # Player id -> queues the player is waiting in
         self.queueMaxSize: dict[int] = {}
         self.player_timeout_time: dict[int] = {}
         self.queues_enabled: dict[bool] = {}
+        self.score_heads: dict[list] = {}
+        self.score_locks: dict[asyncio.Lock] = {}
+        self.rollups: dict[ScoreRollups] = {}
+        self.score_indexes: dict[ScoreIndex] = {}
+        self.standings: dict[dict[Standings]] = {}  # Keyed by queue id, None for the guild-wide standings
+        self.window_standings: dict[dict[tuple]] = {}
+        self.sliding_windows: dict[dict[SlidingWindow]] = {}
+        self.seasons: dict[dict[Season]] = {}
+        self.leaderboard_pages: dict[dict[tuple]] = {}
+        self.embed_caches: dict[EmbedCache] = {}
+        self.member_names: dict[dict[str]] = {}     # Player id -> display name, or None for players no longer in the guild
+        self.score_records: dict[ScoreRecordFile] = {}
+        self.queue_journals: dict[QueueJournal] = {}
+        self.storage_backend: dict[str] = {}
+        self.sqlite_store: SQLiteStore = None
+        self.write_behind = WriteBehind(WRITE_BEHIND_INTERVAL)
+        self.compaction_tasks: dict[asyncio.Task] = {}
 
         asyncio.create_task(self._pre_load_data())
-        self.timeout_tasks = {}
+        self.timeouts = TimeoutScheduler(self._auto_remove_from_queue)  # Keyed by (player, queue)
         self.observers = set()
 
     def cog_unload(self):
         """Clean up when cog shuts down."""
-        for player, tasks in self.timeout_tasks.items():
-            for queue, timeout_task in tasks.items():
-                timeout_task.cancel()
+        self.timeouts.close()
+        for queues in self.queues.values():
+            for six_mans_queue in queues:
+                six_mans_queue.status.cancel()
+        for compaction_task in self.compaction_tasks.values():
+            compaction_task.cancel()
+        # Pending saves are written before the SQLite store is closed. The task is kept on the bot so the next instance
+        # can wait for it, and so it isn't garbage collected before it finishes once nothing else holds on to the cog
+        close_task = asyncio.create_task(self._flush_and_close(getattr(self.bot, CLOSING_TASK_ATTR, None)))
+        setattr(self.bot, CLOSING_TASK_ATTR, close_task)
+
+    async def _flush_and_close(self, previous_close_task=None):
+        if previous_close_task:
+            # An earlier instance's saves go first, so they never overwrite this instance's newer values
+            await asyncio.wait([previous_close_task])
+        await self.write_behind.close()
+        if self.sqlite_store:
+            await self.sqlite_store.close()
+        for records in self.score_records.values():
+            records.close()
+        for journal in self.queue_journals.values():
+            journal.close()
 
 #region commmands
 
@@ -94,6 +176,164 @@ class SixMans(commands.Cog):
         await self._pre_load_data()
         await ctx.send("Done")
 
+    @commands.guild_only()
+    @commands.command(aliases=["migrateScores"])
+    @checks.admin_or_permissions(manage_guild=True)
+    async def migrateScoreTimestamps(self, ctx: Context):
+        """Adds numeric timestamps to saved scores that don't have one yet. Scores are converted one segment at a time."""
+        updated = await self._migrate_score_timestamps(ctx.guild)
+        await ctx.send("Done. Updated **{}** score(s).".format(updated))
+
+    @commands.guild_only()
+    @commands.command(aliases=["flushData"])
+    @checks.admin_or_permissions(manage_guild=True)
+    async def flushSixMansData(self, ctx: Context):
+        """Immediately writes all of the guild's pending saves.
+
+        Scores are always saved as soon as a game finishes. Queue, player stat and active game saves are held for a few seconds
+        so bursts of changes are written once, and are also written when the cog is unloaded."""
+        written = await self.write_behind.flush(ctx.guild)
+        await ctx.send("Done. Wrote **{}** pending save(s). ({} saves requested, {} written since load)".format(
+            written, self.write_behind.saves, self.write_behind.writes))
+
+    @commands.guild_only()
+    @commands.command(aliases=["embedCache"])
+    @checks.admin_or_permissions(manage_guild=True)
+    async def embedCacheStats(self, ctx: Context):
+        """Shows how often leaderboard and rank embeds have been served from the cache since load."""
+        embed_cache = self._embed_cache(ctx.guild)
+        lookups = embed_cache.hits + embed_cache.misses
+        hit_rate = round(embed_cache.hits / lookups * 100, 1) if lookups else 0
+        await ctx.send("Embed cache: **{0}** hit(s), **{1}** miss(es) ({2}% hit rate), **{3}**/{4} embeds cached.".format(
+            embed_cache.hits, embed_cache.misses, hit_rate, len(embed_cache), embed_cache.max_size))
+
+    @commands.guild_only()
+    @commands.command(aliases=["export"])
+    @checks.admin_or_permissions(manage_guild=True)
+    async def exportSixMansData(self, ctx: Context, data, file_format="csv", *, filters: str = None):
+        """Exports `scores` or `players` as a `csv` or `jsonl` file.
+
+        Filters can be added after the format: `--queue <queue name>`, and for scores `--from YYYY-MM-DD` and `--to YYYY-MM-DD` (UTC, inclusive).
+        Player exports hold the guild-wide stats and the stats for each queue."""
+        data, file_format = data.lower(), file_format.lower()
+        if data not in ["scores", "players"]:
+            return await ctx.send(":x: Data must be one of: scores, players")
+        if file_format not in EXPORT_FORMATS:
+            return await ctx.send(":x: Format must be one of: {}".format(", ".join(EXPORT_FORMATS)))
+
+        options = dict(re.findall(r"--(queue|from|to)\s+(.+?)\s*(?=--|$)", filters or ""))
+        queue = None
+        if "queue" in options:
+            queue = self._get_queue_by_name(ctx.guild, options["queue"])
+            if queue is None:
+                return await ctx.send(":x: No queue found with name: {0}".format(options["queue"]))
+        try:
+            start_ts = datetime.datetime.fromisoformat(options["from"]).replace(tzinfo=datetime.timezone.utc).timestamp() if "from" in options else None
+            end_ts = (datetime.datetime.fromisoformat(options["to"]).replace(tzinfo=datetime.timezone.utc) + datetime.timedelta(days=1)).timestamp() if "to" in options else None
+        except ValueError:
+            return await ctx.send(":x: Dates must be in the format YYYY-MM-DD.")
+        if data == "players" and (start_ts or end_ts):
+            return await ctx.send(":x: Date filters only apply to score exports.")
+
+        path = cog_data_path(self) / "exports" / "{0}-{1}-{2}.{3}".format(ctx.guild.id, data, datetime.datetime.now().strftime("%Y%m%d%H%M%S"), file_format)
+        keep_file = False
+        try:
+            async with ctx.typing():
+                if data == "scores":
+                    scores = self._export_scores(ctx.guild, queue.id if queue else None, start_ts, end_ts)
+                    rows = await self._write_export(path, file_format, SCORE_FIELDS, scores)
+                else:
+                    rows = await self._write_export(path, file_format, PLAYER_FIELDS, self._export_players(ctx.guild, queue))
+
+            if path.stat().st_size > ctx.guild.filesize_limit:
+                keep_file = True
+                return await ctx.send("Exported **{0}** row(s), but the file is too large to upload. It has been saved to `{1}`.".format(rows, path))
+            await ctx.send("Exported **{}** row(s).".format(rows), file=discord.File(str(path)))
+        finally:
+            # Only files too large to upload are left for an admin to collect
+            if not keep_file:
+                path.unlink(missing_ok=True)
+
+    @commands.guild_only()
+    @commands.command(aliases=["setStorage"])
+    @checks.admin_or_permissions(manage_guild=True)
+    async def setStorageBackend(self, ctx: Context, backend: str):
+        """Sets where scores, player stats and active games are saved: `config` (default) or `sqlite`.
+
+        The guild's existing data is copied to the new backend. Data in the old backend is left in place.
+        It is best to disable queues while switching."""
+        backend = backend.lower()
+        if backend not in STORAGE_BACKENDS:
+            return await ctx.send(":x: **{}** is not a valid storage backend. Valid backends: {}".format(backend, ", ".join(STORAGE_BACKENDS)))
+        if backend == self.storage_backend[ctx.guild]:
+            return await ctx.send("{} Mans data is already saved with **{}**.".format(self.queueMaxSize[ctx.guild], backend))
+
+        if backend == "sqlite":
+            await self._migrate_to_sqlite(ctx.guild)
+        else:
+            await self._migrate_to_config(ctx.guild)
+        await ctx.send("Done")
+
+    @commands.guild_only()
+    @commands.command(aliases=["setRetention"])
+    @checks.admin_or_permissions(manage_guild=True)
+    async def setScoreRetention(self, ctx: Context, days: int):
+        """Sets how many days of scores are kept in the live score history. Use 0 to keep everything (Default).
+
+        Older scores are moved to a compressed archive by `compactScores`. All-time stats and leaderboards are not affected."""
+        if days < 0:
+            return await ctx.send(":x: Retention must be 0 or more days.")
+        await self.config.guild(ctx.guild).ScoreRetentionDays.set(days if days else None)
+        if days:
+            await ctx.send("Done. Scores older than **{}** days will be archived by `{}compactScores`.".format(days, ctx.prefix))
+        else:
+            await ctx.send("Done. All scores will be kept in the live score history.")
+
+    @commands.guild_only()
+    @commands.command(aliases=["compact"])
+    @checks.admin_or_permissions(manage_guild=True)
+    async def compactScores(self, ctx: Context):
+        """Moves scores older than the retention period into the compressed archive in the background."""
+        retention_days = await self.config.guild(ctx.guild).ScoreRetentionDays()
+        if not retention_days:
+            return await ctx.send(":x: No score retention period is set. Use `{}setScoreRetention` first.".format(ctx.prefix))
+        compaction_task = self.compaction_tasks.get(ctx.guild)
+        if compaction_task and not compaction_task.done():
+            return await ctx.send(":x: Score compaction is already running.")
+
+        self.compaction_tasks[ctx.guild] = asyncio.create_task(self._run_compaction(ctx, retention_days))
+        await ctx.send("Score compaction started. Scores older than **{}** days will be archived.".format(retention_days))
+
+    @commands.guild_only()
+    @commands.command()
+    @checks.admin_or_permissions(manage_guild=True)
+    async def addSeason(self, ctx: Context, name, start_date, end_date):
+        """Adds a named season running from the start of start_date to the end of end_date (UTC). Dates are YYYY-MM-DD.
+
+        Games already played in the season count towards it."""
+        try:
+            season = Season(name, datetime.date.fromisoformat(start_date), datetime.date.fromisoformat(end_date))
+        except ValueError:
+            return await ctx.send(":x: Dates must be in the format YYYY-MM-DD.")
+        if season.last_day < season.first_day:
+            return await ctx.send(":x: The season can't end before it starts.")
+        if name in self.seasons[ctx.guild]:
+            return await ctx.send(":x: There is already a season with the name: {0}".format(name))
+
+        season.load(self.rollups[ctx.guild])
+        self.seasons[ctx.guild][name] = season
+        await self.config.guild(ctx.guild).Seasons.set_raw(name, value=season.to_dict())
+        await ctx.send("Done")
+
+    @commands.guild_only()
+    @commands.command()
+    @checks.admin_or_permissions(manage_guild=True)
+    async def removeSeason(self, ctx: Context, *, name):
+        if self.seasons[ctx.guild].pop(name, None) is None:
+            return await ctx.send(":x: No season found with name: {0}".format(name))
+        await self.config.guild(ctx.guild).Seasons.clear_raw(name)
+        await ctx.send("Done")
+
     @commands.guild_only()
     @commands.command()
     @checks.admin_or_permissions(manage_guild=True)
@@ -113,7 +353,10 @@ class SixMans(commands.Cog):
         points = {Strings.PP_PLAY_KEY: points_per_play, Strings.PP_WIN_KEY: points_per_win}
         team_selection = await self._team_selection(ctx.guild)
         six_mans_queue = SixMansQueue(name, ctx.guild, queue_channels, points, {}, 0, queue_max_size, teamSelection=team_selection, category=await self._category(ctx.guild))
+        six_mans_queue.journal = self.queue_journals.get(ctx.guild)
+        six_mans_queue.status = StatusBroadcaster(six_mans_queue, self.embed_queue_status, STATUS_UPDATE_DELAY)
         self.queues[ctx.guild].append(six_mans_queue)
+        self._index_queue_channels(six_mans_queue)
         await self._save_queues(ctx.guild, self.queues[ctx.guild])
         await ctx.send("Done")
 
@@ -147,7 +390,9 @@ class SixMans(commands.Cog):
 
         six_mans_queue.name = new_name
         six_mans_queue.points = {Strings.PP_PLAY_KEY: points_per_play, Strings.PP_WIN_KEY: points_per_win}
+        self._unindex_queue_channels(six_mans_queue)
         six_mans_queue.channels = queue_channels
+        self._index_queue_channels(six_mans_queue)
         await self._save_queues(ctx.guild, self.queues[ctx.guild])
         await ctx.send("Done")
 
@@ -229,6 +474,12 @@ class SixMans(commands.Cog):
         for queue in self.queues[ctx.guild]:
             if queue.name == queue_name:
                 self.queues[ctx.guild].remove(queue)
+                self._unindex_queue_channels(queue)
+                for player in list(queue.queue):
+                    self._unindex_queue_player(player, queue)
+                    await self.cancel_timeout_task(player, queue)
+                queue.status.discard()
+                self.standings[ctx.guild].pop(queue.id, None)
                 await self._save_queues(ctx.guild, self.queues[ctx.guild])
                 await ctx.send("Done")
                 return
@@ -240,11 +491,15 @@ class SixMans(commands.Cog):
     async def queueMultiple(self, ctx: Context, *members: discord.Member):
         """Mass queueing for testing purposes"""
         six_mans_queue = self._get_queue_by_text_channel(ctx.channel)
-        for member in members:
-            if member in six_mans_queue.queue.queue:
-                await ctx.send("{} is already in queue.".format(member.display_name))
-                break
-            await self._add_to_queue(member, six_mans_queue)
+        already_queued = None
+        async with six_mans_queue.lock:
+            for member in members:
+                if member in six_mans_queue.queue:
+                    already_queued = member
+                    break
+                await self._add_to_queue(member, six_mans_queue)
+        if already_queued:
+            await ctx.send("{} is already in queue.".format(already_queued.display_name))
         if six_mans_queue._queue_full():
             await self._pop_queue(ctx, six_mans_queue)
 
@@ -448,15 +703,17 @@ class SixMans(commands.Cog):
         if not self.queues_enabled[ctx.guild]:
             return await ctx.send(":x: Queueing is currently disabled.")
 
-        if player in six_mans_queue.queue.queue:
-            await ctx.send(":x: You are already in the {0} queue".format(six_mans_queue.name))
-            return
-        for game in self.games[ctx.guild]:
-            if player in game:
-                await ctx.send(":x: You are already in a game")
-                return
-
-        await self._add_to_queue(player, six_mans_queue)
+        # Replies are sent after the lock is released so other joins don't wait on them
+        async with six_mans_queue.lock:
+            if six_mans_queue in self._player_queues(player):
+                error = ":x: You are already in the {0} queue".format(six_mans_queue.name)
+            elif self._get_game_by_player(player):
+                error = ":x: You are already in a game"
+            else:
+                error = None
+                await self._add_to_queue(player, six_mans_queue)
+        if error:
+            return await ctx.send(error)
         if six_mans_queue._queue_full():
             await self._pop_queue(ctx, six_mans_queue)
 
@@ -664,11 +921,10 @@ class SixMans(commands.Cog):
         #TODO: Error catch if Q Lobby VC is deleted
         if type(channel) != discord.TextChannel:
             return
-        queue = None
-        for queue in self.queues[channel.guild]:
-            if channel in queue.channels:
-                queue.channels.remove(channel)
-                break
+        queue = self.channel_queues.get(channel.guild, {}).pop(channel.id, None)
+        if queue is None:
+            return
+        queue.channels.remove(channel)
         if queue.channels:
             return
 
@@ -677,8 +933,32 @@ class SixMans(commands.Cog):
         helper_ping = " {}".format(helper_role.mention) if helper_role else ""
         await clone.send(":grey_exclamation:{0} This channel has been created because the last textChannel for the **{1}** queue has been deleted.".format(helper_ping, queue.name))
         queue.channels.append(clone)
+        self._index_queue_channels(queue)
         await self._save_queues(channel.guild, self.queues[channel.guild])
 
+    @commands.Cog.listener("on_member_join")
+    async def on_member_join(self, member: discord.Member):
+        self._forget_member_name(member)
+
+    @commands.Cog.listener("on_member_remove")
+    async def on_member_remove(self, member: discord.Member):
+        self._forget_member_name(member)
+
+    @commands.Cog.listener("on_member_update")
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.display_name != after.display_name:
+            self._forget_member_name(after)
+
+    @commands.Cog.listener("on_user_update")
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        # Members without a nickname are shown by their username, which only changes through on_user_update
+        if before.name == after.name:
+            return
+        for guild in self.bot.guilds:
+            member = guild.get_member(after.id)
+            if member and member.nick is None:
+                self._forget_member_name(member)
+
     #endregion
 
     #region leaderboard commands
@@ -687,106 +967,108 @@ class SixMans(commands.Cog):
     @commands.group(aliases=["qlb"])
     async def queueLeaderBoard(self, ctx: Context):
         """Get the top ten players in points for the specific queue. If no queue name is given the list will be the top ten players across all queues.
-        If you're not in the top ten your name and rank will be shown at the bottom of the list."""
+        If you're not in the top ten your name and rank will be shown at the bottom of the list. Add `--page <number>` after the queue name to see further pages."""
 
     @commands.guild_only()
     @queueLeaderBoard.command(aliases=["all-time", "alltime"])
     async def overall(self, ctx: Context, *, queue_name: str = None):
         """All-time leader board"""
-        players = None
-        queue = await self._get_queue_by_name(ctx.guild, queue_name) if queue_name else None
+        queue_name, page = self._split_page(queue_name)
+        queue = self._get_queue_by_name(ctx.guild, queue_name) if queue_name else None
         queue_name = queue.name if queue else ctx.guild.name
 
-        if queue:
-            players = queue.players
-            games_played = queue.gamesPlayed
-        else:
-            players = await self._players(ctx.guild)
-            games_played = await self._games_played(ctx.guild)
-
-        if not players:
+        standings = self._standings(ctx.guild, queue)
+        if not len(standings):
             await ctx.send(":x: Queue leaderboard not available for {0}".format(queue_name))
             return
 
-        sorted_players = self._sort_player_dict(players)
-        await ctx.send(embed=await self.embed_leaderboard(ctx, sorted_players, queue_name, games_played, "All-time"))
+        games_played = queue.gamesPlayed if queue else await self._games_played(ctx.guild)
+        await ctx.send(embed=await self.embed_leaderboard(ctx, standings, queue_name, games_played, "All-time", page))
 
 
     @commands.guild_only()
     @queueLeaderBoard.command(aliases=["daily"])
     async def day(self, ctx: Context, *, queue_name: str = None):
         """Daily leader board. All games from the last 24 hours will count"""
-        scores = await self._scores(ctx.guild)
-
+        queue_name, page = self._split_page(queue_name)
         queue = await self._get_queue_by_name(ctx.guild, queue_name) if queue_name else None
         queue_id = queue.id if queue else None
         queue_name = queue.name if queue else ctx.guild.name
-        day_ago = datetime.datetime.now() - datetime.timedelta(days=1)
-        players, games_played = self._filter_scores(ctx.guild, scores, day_ago, queue_id)
+        standings, games_played = await self._window_standings(ctx.guild, datetime.timedelta(days=1), queue_id)
 
-        if not players:
+        if not standings:
             await ctx.send(":x: Queue leaderboard not available for {0}".format(queue_name))
             return
 
-        sorted_players = self._sort_player_dict(players)
-        await ctx.send(embed=await self.embed_leaderboard(ctx, sorted_players, queue_name, games_played, "Daily"))
+        await ctx.send(embed=await self.embed_leaderboard(ctx, standings, queue_name, games_played, "Daily", page))
 
     @commands.guild_only()
     @queueLeaderBoard.command(aliases=["weekly", "wk"])
     async def week(self, ctx: Context, *, queue_name: str = None):
         """Weekly leader board. All games from the last week will count"""
-        scores = await self._scores(ctx.guild)
-
+        queue_name, page = self._split_page(queue_name)
         queue = await self._get_queue_by_name(ctx.guild, queue_name) if queue_name else None
         queue_id = queue.id if queue else None
-        week_ago = datetime.datetime.now() - datetime.timedelta(weeks=1)
-        players, games_played = self._filter_scores(ctx.guild, scores, week_ago, queue_id)
+        standings, games_played = await self._window_standings(ctx.guild, datetime.timedelta(weeks=1), queue_id)
 
-        if not players:
+        if not standings:
             await ctx.send(":x: Queue leaderboard not available for {0}".format(queue_name))
             return
 
         queue_name = queue.name if queue else ctx.guild.name
-        sorted_players = self._sort_player_dict(players)
-        await ctx.send(embed=await self.embed_leaderboard(ctx, sorted_players, queue_name, games_played, "Weekly"))
+        await ctx.send(embed=await self.embed_leaderboard(ctx, standings, queue_name, games_played, "Weekly", page))
 
     @commands.guild_only()
     @queueLeaderBoard.command(aliases=["monthly", "mnth"])
     async def month(self, ctx: Context, *, queue_name: str = None):
         """Monthly leader board. All games from the last 30 days will count"""
-        scores = await self._scores(ctx.guild)
-
+        queue_name, page = self._split_page(queue_name)
         queue = await self._get_queue_by_name(ctx.guild, queue_name) if queue_name else None
         queue_id = queue.id if queue else None
-        month_ago = datetime.datetime.now() - datetime.timedelta(days=30)
-        players, games_played = self._filter_scores(ctx.guild, scores, month_ago, queue_id)
+        standings, games_played = await self._window_standings(ctx.guild, datetime.timedelta(days=30), queue_id)
 
-        if not players:
+        if not standings:
             await ctx.send(":x: Queue leaderboard not available for {0}".format(queue_name))
             return
 
         queue_name = queue.name if queue else ctx.guild.name
-        sorted_players = self._sort_player_dict(players)
-        await ctx.send(embed=await self.embed_leaderboard(ctx, sorted_players, queue_name, games_played, "Monthly"))
+        await ctx.send(embed=await self.embed_leaderboard(ctx, standings, queue_name, games_played, "Monthly", page))
 
     @commands.guild_only()
     @queueLeaderBoard.command(aliases=["yearly", "yr"])
     async def year(self, ctx: Context, *, queue_name: str = None):
         """Yearly leader board. All games from the last 365 days will count"""
-        scores = await self._scores(ctx.guild)
-
+        queue_name, page = self._split_page(queue_name)
         queue = await self._get_queue_by_name(ctx.guild, queue_name) if queue_name else None
         queue_id = queue.id if queue else None
-        year_ago = datetime.datetime.now() - datetime.timedelta(days=365)
-        players, games_played = self._filter_scores(ctx.guild, scores, year_ago, queue_id)
+        standings, games_played = await self._window_standings(ctx.guild, datetime.timedelta(days=365), queue_id)
 
-        if not players:
+        if not standings:
             await ctx.send(":x: Queue leaderboard not available for {0}".format(queue_name))
             return
 
         queue_name = queue.name if queue else ctx.guild.name
-        sorted_players = self._sort_player_dict(players)
-        await ctx.send(embed=await self.embed_leaderboard(ctx, sorted_players, queue_name, games_played, "Yearly"))
+        await ctx.send(embed=await self.embed_leaderboard(ctx, standings, queue_name, games_played, "Yearly", page))
+
+    @commands.guild_only()
+    @queueLeaderBoard.command()
+    async def season(self, ctx: Context, season_name, *, queue_name: str = None):
+        """Season leader board. All games played during the named season will count"""
+        queue_name, page = self._split_page(queue_name)
+        season = self.seasons[ctx.guild].get(season_name)
+        if season is None:
+            await ctx.send(":x: No season found with name: {0}".format(season_name))
+            return
+        queue = self._get_queue_by_name(ctx.guild, queue_name) if queue_name else None
+        queue_id = queue.id if queue else None
+        standings, games_played = season.window(queue_id)
+        queue_name = queue.name if queue else ctx.guild.name
+
+        if not standings:
+            await ctx.send(":x: Queue leaderboard not available for {0}".format(queue_name))
+            return
+
+        await ctx.send(embed=await self.embed_leaderboard(ctx, standings, queue_name, games_played, "{} Season".format(season.name), page))
 
     #endregion
 
@@ -801,106 +1083,106 @@ class SixMans(commands.Cog):
     @rank.command(aliases=["all-time", "overall"])
     async def alltime(self, ctx: Context, player: discord.Member = None, *, queue_name: str = None):
         """All-time ranks"""
-        queue = None
-        if queue_name:
-            queue = await self._get_queue_by_name(ctx.guild, queue_name)
-            players = queue.players
-        else:
-            players = await self._players(ctx.guild)
-            queue_name = ctx.guild.name
+        queue = self._get_queue_by_name(ctx.guild, queue_name) if queue_name else None
+        queue_name = queue.name if queue else ctx.guild.name
 
-        if not players:
+        standings = self._standings(ctx.guild, queue)
+        if not len(standings):
             await ctx.send(":x: Player ranks not available for {0}".format(queue_name))
             return
 
         queue_max_size = queue.maxSize if queue else self.queueMaxSize[ctx.guild]
-        sorted_players = self._sort_player_dict(players)
         player = player if player else ctx.author
-        await ctx.send(embed=self.embed_rank(player, sorted_players, queue_name, queue_max_size, "All-time"))
+        await ctx.send(embed=self.embed_rank(player, standings, queue_name, queue_max_size, "All-time"))
 
     @commands.guild_only()
     @rank.command(aliases=["day"])
     async def daily(self, ctx: Context, player: discord.Member = None, *, queue_name: str = None):
         """Daily ranks. All games from the last 24 hours will count"""
-        scores = await self._scores(ctx.guild)
-
         queue = await self._get_queue_by_name(ctx.guild, queue_name) if queue_name else None
         queue_id = queue.id if queue else None
-        day_ago = datetime.datetime.now() - datetime.timedelta(days=1)
-        players = self._filter_scores(ctx.guild, scores, day_ago, queue_id)[0]
+        standings = (await self._window_standings(ctx.guild, datetime.timedelta(days=1), queue_id))[0]
         queue_name = queue.name if queue else ctx.guild.name
         
-        if not players:
+        if not standings:
             await ctx.send(":x: Player ranks not available for {0}".format(queue_name))
             return
 
         queue_max_size = queue.maxSize if queue else self.queueMaxSize[ctx.guild]
-        sorted_players = self._sort_player_dict(players)
         player = player if player else ctx.author
-        await ctx.send(embed=self.embed_rank(player, sorted_players, queue_name, queue_max_size, "Daily"))
+        await ctx.send(embed=self.embed_rank(player, standings, queue_name, queue_max_size, "Daily"))
 
     @commands.guild_only()
     @rank.command(aliases=["week", "wk"])
     async def weekly(self, ctx: Context, player: discord.Member = None, *, queue_name: str = None):
         """Weekly ranks. All games from the last week will count"""
-        scores = await self._scores(ctx.guild)
-
         queue = await self._get_queue_by_name(ctx.guild, queue_name) if queue_name else None
         queue_id = queue.id if queue else None
-        week_ago = datetime.datetime.now() - datetime.timedelta(weeks=1)
-        players = self._filter_scores(ctx.guild, scores, week_ago, queue_id)[0]
+        standings = (await self._window_standings(ctx.guild, datetime.timedelta(weeks=1), queue_id))[0]
         queue_name = queue.name if queue else ctx.guild.name
 
-        if not players:
+        if not standings:
             await ctx.send(":x: Player ranks not available for {0}".format(queue_name))
             return
 
         queue_max_size = queue.maxSize if queue else self.queueMaxSize[ctx.guild]
-        sorted_players = self._sort_player_dict(players)
         player = player if player else ctx.author
-        await ctx.send(embed=self.embed_rank(player, sorted_players, queue_name, queue_max_size, "Weekly"))
+        await ctx.send(embed=self.embed_rank(player, standings, queue_name, queue_max_size, "Weekly"))
 
     @commands.guild_only()
     @rank.command(aliases=["month", "mnth"])
     async def monthly(self, ctx: Context, player: discord.Member = None, *, queue_name: str = None):
         """Monthly ranks. All games from the last 30 days will count"""
-        scores = await self._scores(ctx.guild)
-
         queue = await self._get_queue_by_name(ctx.guild, queue_name) if queue_name else None
         queue_id = queue.id if queue else None
-        month_ago = datetime.datetime.now() - datetime.timedelta(days=30)
-        players = self._filter_scores(ctx.guild, scores, month_ago, queue_id)[0]
+        standings = (await self._window_standings(ctx.guild, datetime.timedelta(days=30), queue_id))[0]
         queue_name = queue.name if queue else ctx.guild.name
 
-        if not players:
+        if not standings:
             await ctx.send(":x: Player ranks not available for {0}".format(queue_name))
             return
 
         queue_max_size = queue.maxSize if queue else self.queueMaxSize[ctx.guild]
-        sorted_players = self._sort_player_dict(players)
         player = player if player else ctx.author
-        await ctx.send(embed=self.embed_rank(player, sorted_players, queue_name, queue_max_size, "Monthly"))
+        await ctx.send(embed=self.embed_rank(player, standings, queue_name, queue_max_size, "Monthly"))
 
     @commands.guild_only()
     @rank.command(aliases=["year", "yr"])
     async def yearly(self, ctx: Context, player: discord.Member = None, *, queue_name: str = None):
         """Yearly ranks. All games from the last 365 days will count"""
-        scores = await self._scores(ctx.guild)
-
         queue = await self._get_queue_by_name(ctx.guild, queue_name) if queue_name else None
         queue_id = queue.id if queue else None
-        year_ago = datetime.datetime.now() - datetime.timedelta(days=365)
-        players = self._filter_scores(ctx.guild, scores, year_ago, queue_id)[0]
+        standings = (await self._window_standings(ctx.guild, datetime.timedelta(days=365), queue_id))[0]
+        queue_name = queue.name if queue else ctx.guild.name
+
+        if not standings:
+            await ctx.send(":x: Player ranks not available for {0}".format(queue_name))
+            return
+
+        queue_max_size = queue.maxSize if queue else self.queueMaxSize[ctx.guild]
+        player = player if player else ctx.author
+        await ctx.send(embed=self.embed_rank(player, standings, queue_name, queue_max_size, "Yearly"))
+
+    @commands.guild_only()
+    @rank.command(name="season")
+    async def season_rank(self, ctx: Context, season_name, player: discord.Member = None, *, queue_name: str = None):
+        """Season ranks. All games played during the named season will count"""
+        season = self.seasons[ctx.guild].get(season_name)
+        if season is None:
+            await ctx.send(":x: No season found with name: {0}".format(season_name))
+            return
+        queue = self._get_queue_by_name(ctx.guild, queue_name) if queue_name else None
+        queue_id = queue.id if queue else None
+        standings = season.window(queue_id)[0]
         queue_name = queue.name if queue else ctx.guild.name
 
-        if not players:
+        if not standings:
             await ctx.send(":x: Player ranks not available for {0}".format(queue_name))
             return
 
         queue_max_size = queue.maxSize if queue else self.queueMaxSize[ctx.guild]
-        sorted_players = self._sort_player_dict(players)
         player = player if player else ctx.author
-        await ctx.send(embed=self.embed_rank(player, sorted_players, queue_name, queue_max_size, "Yearly"))
+        await ctx.send(embed=self.embed_rank(player, standings, queue_name, queue_max_size, "{} Season".format(season.name)))
 
     #endregion
 
@@ -933,6 +1215,19 @@ class SixMans(commands.Cog):
         await self._save_q_lobby_vc(ctx.guild, None)
         await ctx.send("Done")
 
+    @commands.guild_only()
+    @commands.command(aliases=["upcomingTimeouts", "uto"])
+    async def getUpcomingTimeouts(self, ctx: Context, count: int = 10):
+        """Lists the players who will be timed out of a queue next"""
+        if not await self.has_perms(ctx.author):
+            return
+
+        now = datetime.datetime.now().timestamp()
+        upcoming = self.timeouts.upcoming(count, include=lambda key: key[1].guild == ctx.guild)
+        timeouts = "".join("{0} - {1} in {2}\n".format(player.display_name, six_mans_queue.name,
+            datetime.timedelta(seconds=max(int(expires_at - now), 0))) for expires_at, (player, six_mans_queue) in upcoming)
+        await ctx.send("```Upcoming queue timeouts:\n{0}```".format(timeouts if timeouts else "None\n"))
+
     @commands.guild_only()
     @commands.command(aliases=["qn"])
     async def getQueueNames(self, ctx: Context):
@@ -942,6 +1237,12 @@ class SixMans(commands.Cog):
                 queue_names += "{0}\n".format(queue.name)
         await ctx.send("```Queues set up in server:\n{0}```".format(queue_names))
 
+    @commands.guild_only()
+    @commands.command(aliases=["seasons"])
+    async def getSeasons(self, ctx: Context):
+        seasons = "".join("{0}: {1} to {2}\n".format(season.name, season.first_day, season.last_day) for season in self.seasons[ctx.guild].values())
+        await ctx.send("```Seasons set up in server:\n{0}```".format(seasons if seasons else "None\n"))
+
     @commands.guild_only()
     @commands.command(aliases=["qi"])
     async def getQueueInfo(self, ctx: Context, *, queue_name=None):
@@ -1113,15 +1414,19 @@ class SixMans(commands.Cog):
 
     async def _add_to_queue(self, player: discord.Member, six_mans_queue: SixMansQueue):
         six_mans_queue._put(player)
-        embed = self.embed_player_added(player, six_mans_queue)
-        await six_mans_queue.send_message(embed=embed)
+        self._index_queue_player(player, six_mans_queue)
+        six_mans_queue.status.player_added(player)
         await self.create_timeout_task(player, six_mans_queue, self.player_timeout_time[six_mans_queue.guild])
 
     async def _remove_from_queue(self, player: discord.Member, six_mans_queue: SixMansQueue):
         six_mans_queue._remove(player)
-        embed = self.embed_player_removed(player, six_mans_queue)
-        await six_mans_queue.send_message(embed=embed)
-        await self.remove_timeout_task(player, six_mans_queue)
+        self._leave_queue(player, six_mans_queue)
+        six_mans_queue.status.player_removed(player)
+
+    def _leave_queue(self, player: discord.Member, six_mans_queue: SixMansQueue):
+        """Drops the player's membership index entry and timeout for a queue they have been taken out of."""
+        self._unindex_queue_player(player, six_mans_queue)
+        self.timeouts.cancel((player, six_mans_queue))
 
     async def get_visble_queue_channel(self, six_mans_queue: SixMansQueue, player: discord.Member):
         for channel in six_mans_queue.channels:
@@ -1157,33 +1462,13 @@ class SixMans(commands.Cog):
                 pass
     
     async def create_timeout_task(self, player: discord.Member, six_mans_queue: SixMansQueue, time=None):
-        self.timeout_tasks.setdefault(player, {})
-        self.timeout_tasks[player][six_mans_queue] = asyncio.create_task(self.player_queue_timeout(player, six_mans_queue, time))
-
-    async def player_queue_timeout(self, player: discord.Member, six_mans_queue: SixMansQueue, time=None):
+        """Schedules the player to be removed from the queue once time seconds (default: the guild's player timeout) have passed."""
         if not time:
-            time = self.player_queue_timeout[six_mans_queue.guild]
-
-        await asyncio.sleep(time)
-        try:
-            await self._auto_remove_from_queue(player, six_mans_queue)
-        except:
-            pass
+            time = self.player_timeout_time[six_mans_queue.guild]
+        self.timeouts.schedule((player, six_mans_queue), time)
 
     async def cancel_timeout_task(self, player: discord.Member, six_mans_queue: SixMansQueue):
-        try:
-            self.timeout_tasks[player][six_mans_queue].cancel()
-            await self.remove_timeout_task(player, six_mans_queue)
-        except:
-            pass
-    
-    async def remove_timeout_task(self, player: discord.Member, six_mans_queue: SixMansQueue):
-        try:
-            del self.timeout_tasks[player][six_mans_queue]
-            if not self.timeout_tasks[player]:
-                del self.timeout_tasks[player]
-        except:
-            pass
+        self.timeouts.cancel((player, six_mans_queue))
             
     async def _finish_game(self, guild: discord.Guild, game: Game, six_mans_queue: SixMansQueue, winning_team):
         winning_players = []
@@ -1195,27 +1480,32 @@ class SixMans(commands.Cog):
             winning_players = game.orange
             losing_players = game.blue
 
-        _scores = await self._scores(guild)
-        _players = await self._players(guild)
+        _scores = []
         _games_played = await self._games_played(guild)
-        date_time = datetime.datetime.now().strftime("%d-%b-%Y (%H:%M:%S.%f)")
+        date_time = datetime.datetime.now()
         for player in winning_players:
             score = self._create_player_score(six_mans_queue, game, player, 1, date_time)
             self._give_points(six_mans_queue.players, score)
-            self._give_points(_players, score)
-            _scores.insert(0, score)
+            _scores.append(score)
         for player in losing_players:
             score = self._create_player_score(six_mans_queue, game, player, 0, date_time)
             self._give_points(six_mans_queue.players, score)
-            self._give_points(_players, score)
-            _scores.insert(0, score)
+            _scores.append(score)
 
         _games_played += 1
         six_mans_queue.gamesPlayed += 1
 
-        await self._save_scores(guild, _scores)
+        await self._append_scores(guild, _scores)
+        await self._add_to_rollups(guild, six_mans_queue, _scores, date_time.timestamp())
+        for season in self.seasons[guild].values():
+            season.add_game(six_mans_queue.id, _scores, date_time.timestamp())
+        self.score_indexes[guild].append_game(_scores, date_time.timestamp())
+        self._add_to_standings(guild, six_mans_queue, _scores)
+        self._add_to_window_standings(guild, six_mans_queue, _scores)
+        for sliding_window in self.sliding_windows[guild].values():
+            sliding_window.add_game(six_mans_queue.id, _scores, date_time.timestamp())
         await self._save_queues(guild, self.queues[guild])
-        await self._save_players(guild, _players)
+        await self._save_player_scores(guild, six_mans_queue, _scores)
         await self._save_games_played(guild, _games_played)
 
         if await self._get_automove(guild): # game.automove not working?
@@ -1235,7 +1525,8 @@ class SixMans(commands.Cog):
 
     async def _remove_game(self, guild: discord.Guild, game: Game):
         self.games[guild].remove(game)
-        await self._save_games(guild, self.games[guild])
+        self._unindex_game(guild, game)
+        await self._delete_game(guild, game)
         await asyncio.sleep(CHANNEL_SLEEP_TIME)
         q_lobby_vc = await self._get_q_lobby_vc(guild)
         if not game.scoreReported:
@@ -1285,7 +1576,7 @@ class SixMans(commands.Cog):
         player_dict[Strings.PLAYER_GP_KEY] = player_dict.get(Strings.PLAYER_GP_KEY, 0) + 1
         player_dict[Strings.PLAYER_WINS_KEY] = player_dict.get(Strings.PLAYER_WINS_KEY, 0) + win
 
-    def _create_player_score(self, six_mans_queue: SixMansQueue, game: Game, player: discord.Member, win, date_time):
+    def _create_player_score(self, six_mans_queue: SixMansQueue, game: Game, player: discord.Member, win, date_time: datetime.datetime):
         points_dict = six_mans_queue.points
         if win:
             points_earned = points_dict[Strings.PP_PLAY_KEY] + points_dict[Strings.PP_WIN_KEY]
@@ -1297,63 +1588,131 @@ class SixMans(commands.Cog):
             "Player": player.id,
             "Win": win,
             "Points": points_earned,
-            "DateTime": date_time
+            "DateTime": date_time.strftime("%d-%b-%Y (%H:%M:%S.%f)"),
+            "Timestamp": int(date_time.timestamp())
         }
 
-    def _filter_scores(self, guild, scores, start_date, queue_id):
-        players = {}
-        valid_scores = 0
-        for score in scores:
-            date_time = datetime.datetime.strptime(score["DateTime"], "%d-%b-%Y (%H:%M:%S.%f)")
-            if  date_time > start_date and (queue_id is None or score["Queue"] == queue_id):
-                self._give_points(players, score)
-                valid_scores +=1
-            else:
-                break
-        games_played = (valid_scores // self.queueMaxSize[guild])
-        return players, games_played
-
-    def _sort_player_dict(self, player_dict):
-        sorted_players = sorted(player_dict.items(), key=lambda x: x[1][Strings.PLAYER_WINS_KEY], reverse=True)
-        return sorted(sorted_players, key=lambda x: x[1][Strings.PLAYER_POINTS_KEY], reverse=True)
+    def _score_timestamp(self, score):
+        """Epoch seconds for a score. Scores saved before the Timestamp field existed fall back to parsing DateTime."""
+        try:
+            return score["Timestamp"]
+        except KeyError:
+            return int(datetime.datetime.strptime(score["DateTime"], "%d-%b-%Y (%H:%M:%S.%f)").timestamp())
+
+    async def _filter_scores(self, guild, start_date, queue_id):
+        """Player totals and games played since start_date.
+
+        Exact totals come from the in-memory score index, plus the memory-mapped archive records for windows reaching into
+        archived scores. The hour/day rollups are used if the archive has no records."""
+        start_ts = start_date.timestamp()
+        score_index = self.score_indexes[guild]
+        if score_index.covers(start_ts):
+            return score_index.window(start_ts, queue_id)
+        records = self.score_records.get(guild)
+        if records is not None and len(records):
+            archived_players, archived_games = await asyncio.get_event_loop().run_in_executor(None, records.window, start_ts, queue_id)
+            players, games_played = score_index.window(start_ts, queue_id)
+            for player_id, stats in archived_players.items():
+                player_dict = players.setdefault(player_id, {Strings.PLAYER_POINTS_KEY: 0, Strings.PLAYER_GP_KEY: 0, Strings.PLAYER_WINS_KEY: 0})
+                for key, value in stats.items():
+                    player_dict[key] += value
+            return players, games_played + archived_games
+        return self.rollups[guild].window(start_ts, datetime.datetime.now().timestamp(), queue_id)
+
+    async def _window_standings(self, guild: discord.Guild, period: datetime.timedelta, queue_id):
+        """Standings and games played for the period up to now. Sliding windows answer directly, other periods are
+        rebuilt once the cache time runs out and have finished games added to them in the meantime."""
+        now = datetime.datetime.now()
+        sliding_window = self.sliding_windows[guild].get(period)
+        if sliding_window:
+            sliding_window.expire(now.timestamp())
+            return sliding_window.window(queue_id)
+
+        cache = self.window_standings.setdefault(guild, {})
+        cached = cache.get((period, queue_id))
+        if cached and (now - cached[0]).total_seconds() < WINDOW_STANDINGS_CACHE_TIME:
+            return cached[1], cached[2]
+        players, games_played = await self._filter_scores(guild, now - period, queue_id)
+        standings = Standings(players)
+        cache[(period, queue_id)] = (now, standings, games_played)
+        return standings, games_played
 
     async def _pop_queue(self, ctx: Context, six_mans_queue: SixMansQueue):
-        game = await self._create_game(ctx.guild, six_mans_queue, prefix=ctx.prefix)
-        if game is None:
-            return False
+        """Creates a game from the players at the front of the queue, if it is full.
 
-        #Remove players from any other queue they were in
-        for player in game.players:
-            for queue in self.queues[ctx.guild]:
-                if player in queue.queue:
-                    await self._remove_from_queue(player, queue)
+        The players are taken from the queue while holding its lock, but the game's channels are created after it has been
+        released so joins and leaves don't wait on Discord. If the game can't be created the players get their places back.
+        """
+        guild = ctx.guild
+        helper_role = await self._helper_role(guild)
+        automove = await self._get_automove(guild)
+        use_reactions = await self._is_react_to_vote(guild)
+
+        async with six_mans_queue.lock:
+            if not six_mans_queue._queue_full():
+                return False
+            joined = [(player, six_mans_queue.activeJoinLog.get(player.id))
+                for player in itertools.islice(six_mans_queue.queue, six_mans_queue.maxSize)]
+            game = Game(
+                [player for player, _ in joined],
+                six_mans_queue,
+                helper_role=helper_role,
+                automove=automove,
+                use_reactions=use_reactions,
+                observers=self.observers,
+                prefix=ctx.prefix
+            )
+            self._take_players(guild, game)
+
+        try:
+            await self._create_game(guild, game)
+        except Exception:
+            async with six_mans_queue.lock:
+                self._return_players(guild, game, joined)
+            raise
 
         # Notify all players that queue has popped
         # await game.textChannel.send("{}\n".format(", ".join([player.mention for player in game.players])))
 
-        self.games[ctx.guild].append(game)
-        await self._save_games(ctx.guild, self.games[ctx.guild])
+        self.games[guild].append(game)
+        self._index_game(guild, game)
+        await self._save_game(guild, game)
         return True
 
-    async def _create_game(self, guild: discord.Guild, six_mans_queue: SixMansQueue, prefix="?"):
-        if not six_mans_queue._queue_full():
-            return None
-        players = [six_mans_queue._get() for _ in range(six_mans_queue.maxSize)]
-
-        await six_mans_queue.send_message(message="**Queue is full! Game is being created.**")
-
-        game = Game(
-            players,
-            six_mans_queue,
-            helper_role=await self._helper_role(guild),
-            automove=await self._get_automove(guild),
-            use_reactions=await self._is_react_to_vote(guild),
-            observers=self.observers,
-            prefix=prefix
-        )
+    def _take_players(self, guild: discord.Guild, game: Game):
+        """Moves the game's players out of its queue, and any other queue they are in, into the game.
+
+        Nothing is awaited, so the players can't be popped by another queue or join one before their game exists.
+        """
+        six_mans_queue = game.queue
+        self._index_game(guild, game)
+        for player in game.players:
+            six_mans_queue._remove(player)
+            self._leave_queue(player, six_mans_queue)
+            #Remove players from any other queue they were in
+            for queue in list(self._player_queues(player)):
+                queue._remove(player)
+                self._leave_queue(player, queue)
+                queue.status.player_removed(player)
+        # The pop message replaces the status update for the last players to join
+        six_mans_queue.status.discard()
+
+    def _return_players(self, guild: discord.Guild, game: Game, joined):
+        """Puts the players of a game that couldn't be created back at the front of its queue, in the order they joined."""
+        six_mans_queue = game.queue
+        self._unindex_game(guild, game)
+        now = datetime.datetime.now().timestamp()
+        for player, joined_at in reversed(joined):
+            joined_at = joined_at or now
+            six_mans_queue._put(player, joined_at, front=True)
+            self._index_queue_player(player, six_mans_queue)
+            self.timeouts.schedule((player, six_mans_queue), max(self.player_timeout_time[guild] - (now - joined_at), 0))
+            six_mans_queue.status.player_added(player)
+
+    async def _create_game(self, guild: discord.Guild, game: Game):
+        await game.queue.send_message(message="**Queue is full! Game is being created.**")
         await game.create_game_channels(await self._category(guild))
         await game.process_team_selection_method()
-        return game
 
     async def _get_info(self, ctx: Context):
         game = self._get_game_by_text_channel(ctx.channel)
@@ -1391,17 +1750,57 @@ class SixMans(commands.Cog):
             return None, None
 
     def _get_game_by_text_channel(self, channel: discord.TextChannel):
-        for game in self.games.get(channel.guild, []):
-            if game.textChannel == channel:
-                return game
-        return None
+        return self.channel_games.get(channel.guild, {}).get(channel.id)
 
     def _get_queue_by_text_channel(self, channel: discord.TextChannel):
-        for six_mans_queue in self.queues[channel.guild]:
-            for queuechannel in six_mans_queue.channels:
-                if queuechannel == channel:
-                    return six_mans_queue
-        return None
+        return self.channel_queues.get(channel.guild, {}).get(channel.id)
+
+    def _index_queue_channels(self, six_mans_queue: SixMansQueue):
+        channel_queues = self.channel_queues.setdefault(six_mans_queue.guild, {})
+        for channel in six_mans_queue.channels:
+            if channel:
+                channel_queues[channel.id] = six_mans_queue
+
+    def _unindex_queue_channels(self, six_mans_queue: SixMansQueue):
+        channel_queues = self.channel_queues.get(six_mans_queue.guild, {})
+        for channel in six_mans_queue.channels:
+            if channel and channel_queues.get(channel.id) is six_mans_queue:
+                del channel_queues[channel.id]
+
+    def _index_game(self, guild: discord.Guild, game: Game):
+        if game.textChannel:
+            self.channel_games.setdefault(guild, {})[game.textChannel.id] = game
+        player_games = self.player_games.setdefault(guild, {})
+        for player in game.players:
+            if player:
+                player_games[player.id] = game
+
+    def _unindex_game(self, guild: discord.Guild, game: Game):
+        channel_games = self.channel_games.get(guild, {})
+        if game.textChannel and channel_games.get(game.textChannel.id) is game:
+            del channel_games[game.textChannel.id]
+        player_games = self.player_games.get(guild, {})
+        for player in game.players:
+            if player and player_games.get(player.id) is game:
+                del player_games[player.id]
+
+    def _get_game_by_player(self, player: discord.Member):
+        return self.player_games.get(player.guild, {}).get(player.id)
+
+    def _player_queues(self, player: discord.Member):
+        """The queues the player is waiting in."""
+        return self.player_queues.get(player.guild, {}).get(player.id, set())
+
+    def _index_queue_player(self, player: discord.Member, six_mans_queue: SixMansQueue):
+        self.player_queues.setdefault(six_mans_queue.guild, {}).setdefault(player.id, set()).add(six_mans_queue)
+
+    def _unindex_queue_player(self, player: discord.Member, six_mans_queue: SixMansQueue):
+        player_queues = self.player_queues.get(six_mans_queue.guild, {})
+        queues = player_queues.get(player.id)
+        if queues is not None:
+            queues.discard(six_mans_queue)
+            if not queues:
+                del player_queues[player.id]
 
     def _get_queue_by_name(self, guild: discord.Guild, queue_name):
         for queue in self.queues[guild]:
@@ -1483,19 +1882,20 @@ class SixMans(commands.Cog):
 
 #region embed and string format methods
 
-    def embed_player_added(self, player: discord.Member, six_mans_queue: SixMansQueue):
+    def embed_queue_status(self, six_mans_queue: SixMansQueue, added: List[discord.Member], removed: List[discord.Member]):
         player_list = self.format_player_list(six_mans_queue)
-        embed = discord.Embed(color=discord.Colour.green())
-        embed.set_author(name="{0} added to the {1} queue. ({2}/{3})".format(player.display_name, six_mans_queue.name,
-            six_mans_queue.queue.qsize(), six_mans_queue.maxSize), icon_url="{}".format(player.avatar_url))
-        embed.add_field(name="Players in Queue", value=player_list, inline=False)
-        return embed
-
-    def embed_player_removed(self, player: discord.Member, six_mans_queue: SixMansQueue):
-        player_list = self.format_player_list(six_mans_queue)
-        embed = discord.Embed(color=discord.Colour.red())
-        embed.set_author(name="{0} removed from the {1} queue. ({2}/{3})".format(player.display_name, six_mans_queue.name,
-            six_mans_queue.queue.qsize(), six_mans_queue.maxSize), icon_url="{}".format(player.avatar_url))
+        changes = []
+        if added:
+            changes.append("{0} added to".format(", ".join([player.display_name for player in added])))
+        if removed:
+            changes.append("{0} removed from".format(", ".join([player.display_name for player in removed])))
+        embed = discord.Embed(color=discord.Colour.green() if len(added) >= len(removed) else discord.Colour.red())
+        name = "{0} the {1} queue. ({2}/{3})".format(" and ".join(changes), six_mans_queue.name,
+            six_mans_queue.queue.qsize(), six_mans_queue.maxSize)
+        if len(added) + len(removed) == 1:
+            embed.set_author(name=name, icon_url="{}".format((added + removed)[0].avatar_url))
+        else:
+            embed.set_author(name=name)
         embed.add_field(name="Players in Queue", value=player_list, inline=False)
         return embed
 
@@ -1521,7 +1921,7 @@ class SixMans(commands.Cog):
     def embed_queue_players(self, queue: SixMansQueue):
         player_list = self.format_player_list(queue)
         embed = discord.Embed(title="{0} {1} Mans Queue".format(queue.name, queue.maxSize), color=discord.Colour.blue())
-        embed.add_field(name="Players in Queue ({}/{})".format(len(queue.queue.queue), queue.maxSize), value=player_list, inline=False)
+        embed.add_field(name="Players in Queue ({}/{})".format(len(queue.queue), queue.maxSize), value=player_list, inline=False)
         return embed
 
     def embed_active_games(self, guild, queueGames: Dict[int, List[Game]]):
@@ -1532,92 +1932,138 @@ class SixMans(commands.Cog):
             embed.add_field(name="{}:".format(queueName), value="{}".format("\n".join(["{0}\n{1}".format(str(game.id), ", ".join([player.mention for player in game.players])) for game in games])), inline=False)
         return embed
 
-    async def embed_leaderboard(self, ctx: Context, sorted_players, queue_name, games_played, lb_format):
+    async def embed_leaderboard(self, ctx: Context, standings: Standings, queue_name, games_played, lb_format, page=1):
+        page_count = -(-len(standings) // LEADERBOARD_PAGE_SIZE)
+        page = min(max(page, 1), max(page_count, 1))
+        author = ctx.author
+        author_index = standings.rank(author.id)
+        if author_index is not None and author_index // LEADERBOARD_PAGE_SIZE == page - 1:
+            author_index = None     # Already listed on the page
+        cache_key = ("Leaderboard", queue_name, lb_format, games_played, page, author_index, author.display_name if author_index is not None else None)
+        embed = self._embed_cache(ctx.guild).get(cache_key, standings)
+        if embed:
+            return embed
+
         embed = discord.Embed(title="{0} {1} Mans {2} Leaderboard".format(queue_name, self.queueMaxSize[ctx.guild], lb_format), color=discord.Colour.blue())
         embed.add_field(name="Games Played", value="{}\n".format(games_played), inline=True)
-        embed.add_field(name="Unique Players", value="{}\n".format(len(sorted_players)), inline=True)
+        embed.add_field(name="Unique Players", value="{}\n".format(len(standings)), inline=True)
         embed.add_field(name="⠀", value="⠀", inline=True) # Blank field added to push the Player and Stats fields to a new line
-        
-        index = 1
-        playerStrings = []
-        statStrings = []
-        for player in sorted_players:
-            try:
-                member: discord.Member = await commands.MemberConverter().convert(ctx, player[0])
-            except:
-                await ctx.send(":x: Can't find player with id: {}".format(player[0]))
-                continue
 
-            player_info = player[1]
-            playerStrings.append("`{0}` **{1:25s}:**".format(index, member.display_name))
-            try:
-                player_wins = player_info[Strings.PLAYER_WINS_KEY]
-                player_gp = player_info[Strings.PLAYER_GP_KEY]
-                player_wp = round(player_wins/player_gp*100, 1)
-                player_wp = f"{player_wp}%" if player_wp != 100 else "100%"
-            except ZeroDivisionError:
-                player_wp = "N/A"
-
-            statStrings.append("Points: `{0:4d}`  Wins: `{1:3d}`  GP: `{2:3d}` WP: `{3:5s}`".format(
-                player_info[Strings.PLAYER_POINTS_KEY],
-                player_wins,
-                player_gp,
-                player_wp
-                )
-            )
-            
-            index += 1
-            if index > 10:
-                break
-        
-        author = ctx.author
-        try:
-            author_index = [y[0] for y in sorted_players].index("{0}".format(author.id))
-            if author_index is not None and author_index > 9:
-                author_info = sorted_players[author_index][1]
-                playerStrings.append("\n`{0}` **{1:25s}:**".format(author_index + 1, author.display_name))
-                try:
-                    author_wins = author_info[Strings.PLAYER_WINS_KEY]
-                    author_gp = author_info[Strings.PLAYER_GP_KEY]
-                    author_wp = round(author_wins/author_gp*100, 1)
-                    author_wp = f"{author_wp}%" if author_wp != 100 else "100%"
-                except ZeroDivisionError:
-                    author_wp = "N/A"
-
-                statStrings.append("\nPoints: `{0:4d}`  Wins: `{1:3d}`  GP: `{2:3d}` WP: `{3:5s}`".format(
-                    author_info[Strings.PLAYER_POINTS_KEY],
-                    author_wins,
-                    author_gp,
-                    author_wp
-                ))
-        except Exception:
-            pass
+        playerStrings, statStrings = map(list, self._leaderboard_page(ctx.guild, standings, queue_name, lb_format, page))
+        if author_index is not None:
+            playerStrings.append("\n`{0}` **{1:25s}:**".format(author_index + 1, author.display_name))
+            statStrings.append("\n" + self._leaderboard_stats(standings.players["{0}".format(author.id)]))
 
         embed.add_field(name="Player", value="{}\n".format("\n".join(playerStrings)), inline=True)
         embed.add_field(name="Stats", value="{}\n".format("\n".join(statStrings)), inline=True)
+        if page_count > 1:
+            embed.set_footer(text="Page {0}/{1}. Use --page <number> to see other pages.".format(page, page_count))
+        self._embed_cache(ctx.guild).put(cache_key, standings, embed)
         return embed
 
-    def embed_rank(self, player, sorted_players, queue_name, queue_max_size, rank_format):
+    def _leaderboard_page(self, guild: discord.Guild, standings: Standings, queue_name, lb_format, page):
+        """Rendered (player lines, stat lines) for one page of the standings, numbered by standings rank so positions match
+        `rank`. Players no longer in the guild are left out. Only the page's own players are read, and the lines are reused
+        until a player, stat or name on that page changes."""
+        start = (page - 1) * LEADERBOARD_PAGE_SIZE
+        rows = [
+            (player_id, self._member_name(guild, player_id), tuple(player_info.values()))
+            for player_id, player_info in itertools.islice(standings.items(start), LEADERBOARD_PAGE_SIZE)
+        ]
+        cache = self.leaderboard_pages.setdefault(guild, {})
+        cached = cache.get((queue_name, lb_format, page))
+        if cached and cached[0] == rows:
+            return cached[1]
+
+        player_lines, stat_lines = [], []
+        for index, (player_id, display_name, _) in enumerate(rows, start):
+            if display_name is None:
+                continue
+            player_lines.append("`{0}` **{1:25s}:**".format(index + 1, display_name))
+            stat_lines.append(self._leaderboard_stats(standings.players[player_id]))
+        lines = cache[(queue_name, lb_format, page)] = (rows, (player_lines, stat_lines))
+        return lines[1]
+
+    def _leaderboard_stats(self, player_info):
         try:
-            num_players = len(sorted_players)
-            points_index = [y[0] for y in sorted_players].index("{0}".format(player.id))
-            player_info = sorted_players[points_index][1]
+            player_wins = player_info[Strings.PLAYER_WINS_KEY]
+            player_gp = player_info[Strings.PLAYER_GP_KEY]
+            player_wp = round(player_wins/player_gp*100, 1)
+            player_wp = f"{player_wp}%" if player_wp != 100 else "100%"
+        except ZeroDivisionError:
+            player_wp = "N/A"
+
+        return "Points: `{0:4d}`  Wins: `{1:3d}`  GP: `{2:3d}` WP: `{3:5s}`".format(
+            player_info[Strings.PLAYER_POINTS_KEY],
+            player_wins,
+            player_gp,
+            player_wp
+        )
+
+    def _split_page(self, queue_name):
+        """Splits a trailing "--page N" off a leaderboard command's queue name. Returns (queue_name, page)."""
+        if queue_name:
+            match = re.fullmatch(r"(.*?)\s*--page\s+(\d+)", queue_name.strip())
+            if match:
+                return match.group(1) or None, int(match.group(2))
+        return queue_name, 1
+
+    def _member_name(self, guild: discord.Guild, player_id):
+        """Display name of the player from the member cache, or None if they are not in the guild. Both results are
+        remembered until the member joins, leaves or changes their name."""
+        names = self.member_names.setdefault(guild, {})
+        player_id = str(player_id)
+        try:
+            return names[player_id]
+        except KeyError:
+            member = guild.get_member(int(player_id))
+            display_name = names[player_id] = member.display_name if member else None
+            return display_name
+
+    def _forget_member_name(self, member: discord.Member):
+        """Drops the member's remembered name, and the embeds that may show it. Embeds are only rendered with names that
+        were looked up through _member_name, so members who were never shown leave the embed cache alone."""
+        names = self.member_names.get(member.guild, {})
+        if str(member.id) in names:
+            del names[str(member.id)]
+            self._embed_cache(member.guild).clear()
+
+    def embed_rank(self, player, standings: Standings, queue_name, queue_max_size, rank_format):
+        cache_key = ("Rank", queue_name, queue_max_size, rank_format, player.id, player.display_name, str(player.avatar_url))
+        embed = self._embed_cache(player.guild).get(cache_key, standings)
+        if embed:
+            return embed
+
+        try:
+            num_players = len(standings)
+            player_info = standings.players["{0}".format(player.id)]
             points, wins, games_played = player_info[Strings.PLAYER_POINTS_KEY], player_info[Strings.PLAYER_WINS_KEY], player_info[Strings.PLAYER_GP_KEY]
-            wins_index = [y[0] for y in sorted(sorted_players, key=lambda x: x[1][Strings.PLAYER_WINS_KEY], reverse=True)].index("{0}".format(player.id))
-            games_played_index = [y[0] for y in sorted(sorted_players, key=lambda x: x[1][Strings.PLAYER_GP_KEY], reverse=True)].index("{0}".format(player.id))
+            points_index = standings.rank(player.id, Strings.PLAYER_POINTS_KEY)
+            wins_index = standings.rank(player.id, Strings.PLAYER_WINS_KEY)
+            games_played_index = standings.rank(player.id, Strings.PLAYER_GP_KEY)
+            win_percentage_index = standings.rank(player.id, WIN_PERCENTAGE)
+            player_wp = round(win_percentage(player_info)*100, 1)
             embed = discord.Embed(title="{0} {1} {2} Mans {3} Rank".format(player.display_name, queue_name, queue_max_size, rank_format), color=discord.Colour.blue())
             embed.set_thumbnail(url=player.avatar_url)
             embed.add_field(name="Points:", value="**Value:** {2} | **Rank:** {0}/{1}".format(points_index + 1, num_players, points), inline=True)
             embed.add_field(name="Wins:", value="**Value:** {2} | **Rank:** {0}/{1}".format(wins_index + 1, num_players, wins), inline=True)
             embed.add_field(name="Games Played:", value="**Value:** {2} | **Rank:** {0}/{1}".format(games_played_index + 1, num_players, games_played), inline=True)
+            embed.add_field(name="Win Percentage:", value="**Value:** {2}% | **Rank:** {0}/{1}".format(win_percentage_index + 1, num_players, player_wp), inline=True)
         except:
             embed = discord.Embed(title="{0} {1} {2} Mans {3} Rank".format(player.display_name, queue_name, queue_max_size, rank_format), color=discord.Colour.red(),
                 description="No stats yet to rank {}".format(player.mention))
             embed.set_thumbnail(url=player.avatar_url)
+        self._embed_cache(player.guild).put(cache_key, standings, embed)
         return embed
 
+    def _embed_cache(self, guild: discord.Guild):
+        embed_cache = self.embed_caches.get(guild)
+        if embed_cache is None:
+            embed_cache = self.embed_caches[guild] = EmbedCache(EMBED_CACHE_SIZE)
+        return embed_cache
+
     def format_player_list(self, queue: SixMansQueue):
-        player_list = "{}".format(", ".join([player.mention for player in queue.queue.queue]))
+        player_list = "{}".format(", ".join([player.mention for player in queue.queue]))
         if player_list == "":
             player_list = "No players currently in the queue"
         return player_list
@@ -1627,18 +2073,36 @@ class SixMans(commands.Cog):
 #region load/save methods
     async def _pre_load_data(self):
         await self.bot.wait_until_ready()
+        close_task = getattr(self.bot, CLOSING_TASK_ATTR, None)
+        if close_task:
+            # After a reload, the unloaded instance may still be writing its pending saves
+            await asyncio.wait([close_task])
         self.queues = {}
         self.games = {}
 
+        # Queued players are restored from the queue journals, with new timeouts
+        self.timeouts.clear()
+
         for guild in self.bot.guilds:
+            await self.write_behind.flush(guild)
             self.queues[guild] = []
             self.games[guild] = []
+            self.channel_queues[guild] = {}
+            self.channel_games[guild] = {}
+            self.player_games[guild] = {}
+            self.player_queues[guild] = {}
 
             # Preload General Data
             saved_queues_enabled = await self._get_queues_enabled(guild)
             self.queues_enabled[guild] = saved_queues_enabled if (saved_queues_enabled is not None) else True
             self.queueMaxSize[guild] = await self._get_queue_max_size(guild)
             self.player_timeout_time[guild] = await self._player_timeout(guild) ## if not DEBUG else PLAYER_TIMEOUT_TIME
+            self.storage_backend[guild] = await self.config.guild(guild).StorageBackend()
+            store = self._sqlite(guild)
+            await self._migrate_legacy_scores(guild)
+            await self._load_rollups(guild)
+            await self._load_score_records(guild)
+            await self._load_score_index(guild)
 
             # Pre-load Queues
             queues = await self._queues(guild)
@@ -1666,7 +2130,7 @@ class SixMans(commands.Cog):
                     lobby_vc = None
                 six_mans_queue = SixMansQueue(queue_name, guild, queue_channels, 
                     value["Points"], 
-                    value["Players"], 
+                    await store.run(store.players, guild.id, key) if store else value["Players"],
                     value["GamesPlayed"], 
                     queue_size, 
                     teamSelection=team_selection,
@@ -1675,8 +2139,15 @@ class SixMans(commands.Cog):
                 )
                 
                 six_mans_queue.id = int(key)
+                six_mans_queue.status = StatusBroadcaster(six_mans_queue, self.embed_queue_status, STATUS_UPDATE_DELAY)
                 self.queues[guild].append(six_mans_queue)
+                self._index_queue_channels(six_mans_queue)
             
+            await self._restore_queues(guild)
+            await self._load_standings(guild)
+            await self._load_sliding_windows(guild)
+            await self._load_seasons(guild)
+
             # Pre-load Games
             games = await self._games(guild)
             game_list = []
@@ -1709,13 +2180,50 @@ class SixMans(commands.Cog):
                     await game.process_team_selection_method()
                 game.scoreReported = value["ScoreReported"]
                 game_list.append(game)
+                self._index_game(guild, game)
             
             self.games[guild] = game_list
 
+    async def _restore_queues(self, guild: discord.Guild):
+        """Replays the guild's queue journal so players queued before a restart or reload are back in the same order,
+        with whatever remains of their queue timeout."""
+        if guild in self.queue_journals:
+            self.queue_journals[guild].close()
+        journal = self.queue_journals[guild] = QueueJournal(cog_data_path(self) / "queue_journal" / "{}.jsonl".format(guild.id))
+        saved_queues = journal.replay()
+        now = datetime.datetime.now().timestamp()
+        restored = {}
+        for six_mans_queue in self.queues[guild]:
+            for player_id, joined_at in saved_queues.get(six_mans_queue.id, {}).items():
+                player = guild.get_member(player_id)
+                remaining = self.player_timeout_time[guild] - (now - joined_at)
+                if player is None or remaining <= 0:
+                    continue
+                six_mans_queue._put(player, joined_at)
+                self._index_queue_player(player, six_mans_queue)
+                await self.create_timeout_task(player, six_mans_queue, remaining)
+                restored.setdefault(six_mans_queue.id, {})[player_id] = joined_at
+            six_mans_queue.journal = journal
+        # Compacts the journal down to the players that are still queued
+        journal.rewrite(restored)
+
     async def _clear_all_data(self, guild: discord.Guild):
-        await self._save_games(guild, [])
+        await self.write_behind.flush(guild)
+        store = self._sqlite(guild)
+        if store:
+            await store.run(store.clear_guild, guild.id)
+        await self.config.guild(guild).Games.clear()
         await self._save_queues(guild, [])
-        await self._save_scores(guild, [])
+        await self._clear_scores(guild)
+        await self._clear_archive(guild)
+        await self._load_score_records(guild)
+        await self._clear_rollups(guild)
+        self.score_indexes[guild] = ScoreIndex()
+        self.standings[guild] = {None: Standings()}
+        self.window_standings.pop(guild, None)
+        self.sliding_windows[guild] = {period: SlidingWindow(period.total_seconds()) for period in SLIDING_WINDOWS}
+        await self.config.guild(guild).Seasons.clear()
+        self.seasons[guild] = {}
         await self._save_games_played(guild, 0)
         await self._save_players(guild, {})
         await self._save_category(guild, None)
@@ -1726,37 +2234,467 @@ class SixMans(commands.Cog):
         await self._save_team_selection(guild, Strings.RANDOM_TS)
         await self._save_react_to_vote(guild, True)
         await self._save_automove(guild, False)
+        await self.write_behind.flush(guild)
+
+    def _sqlite(self, guild: discord.Guild):
+        """Returns the SQLite store if the guild saves its data there, otherwise None."""
+        if self.storage_backend.get(guild) != "sqlite":
+            return None
+        return self._open_sqlite()
+
+    def _open_sqlite(self):
+        if not self.sqlite_store:
+            self.sqlite_store = SQLiteStore(cog_data_path(self) / "sixMans.db")
+        return self.sqlite_store
+
+    async def _migrate_to_sqlite(self, guild: discord.Guild):
+        """Copies the guild's Config scores, player stats and active games into SQLite, one score segment at a time."""
+        await self.write_behind.flush(guild)
+        store = self._open_sqlite()
+        await store.run(store.clear_guild, guild.id)
+        head_index, head = await self._score_head(guild)
+        segment_start = await self.config.guild(guild).ScoreSegmentStart()
+        segment_count = await self.config.guild(guild).ScoreSegments()
+        for index in range(segment_start, segment_count):
+            segment = head if index == head_index else await self.config.custom("ScoreSegment", guild.id, index).Scores()
+            await store.run(store.append_scores, guild.id, [dict(score, Timestamp=self._score_timestamp(score)) for score in segment])
+        await store.run(store.set_players, guild.id, None, await self._players(guild))
+        for queue in self.queues[guild]:
+            await store.run(store.set_players, guild.id, queue.id, queue.players)
+        await store.run(store.save_games, guild.id, {game.id: game._to_dict() for game in self.games[guild]})
+
+        self.storage_backend[guild] = "sqlite"
+        await self.config.guild(guild).StorageBackend.set("sqlite")
+        await self._save_queues(guild, self.queues[guild])
+
+    async def _migrate_to_config(self, guild: discord.Guild):
+        """Copies the guild's SQLite scores, player stats and active games back into Config."""
+        await self.write_behind.flush(guild)
+        store = self._open_sqlite()
+        players = await store.run(store.players, guild.id)
+        self.storage_backend[guild] = "config"
+        await self.config.guild(guild).StorageBackend.set("config")
+
+        await self._clear_scores(guild)
+        async for batch in store.score_batches(guild.id, oldest_first=True):
+            await self._append_scores(guild, batch)
+        await self._save_players(guild, players)
+        await self._save_queues(guild, self.queues[guild])
+        for game in self.games[guild]:
+            await self._save_game(guild, game)
 
     async def _games(self, guild: discord.Guild):
+        store = self._sqlite(guild)
+        if store:
+            return await store.run(store.games, guild.id)
         return await self.config.guild(guild).Games()
 
-    async def _save_games(self, guild: discord.Guild, games: List[Game]):
-        game_dict = {}
-        for game in games:
-            game_dict[game.id] = game._to_dict()
-        await self.config.guild(guild).Games.set(game_dict)
+    async def _save_game(self, guild: discord.Guild, game: Game):
+        """Saves a single active game under its own key, leaving the other games untouched."""
+        store = self._sqlite(guild)
+        if store:
+            async def write(value):
+                await store.run(store.save_game, guild.id, game.id, value)
+        else:
+            async def write(value):
+                await self.config.guild(guild).Games.set_raw(str(game.id), value=value)
+        self.write_behind.save(guild, "Game {}".format(game.id), game._to_dict(), write)
+
+    async def _delete_game(self, guild: discord.Guild, game: Game):
+        store = self._sqlite(guild)
+        if store:
+            async def write(value):
+                await store.run(store.remove_game, guild.id, game.id)
+        else:
+            async def write(value):
+                await self.config.guild(guild).Games.clear_raw(str(game.id))
+        self.write_behind.save(guild, "Game {}".format(game.id), None, write)
 
     async def _queues(self, guild: discord.Guild):
-        return await self.config.guild(guild).Queues()
+        return await self.write_behind.get(guild, "Queues", self.config.guild(guild).Queues)
 
     async def _save_queues(self, guild: discord.Guild, queues: List[SixMansQueue]):
+        store = self._sqlite(guild)
         queue_dict = {}
         for queue in queues:
             if queue.guild == guild:
                 queue_dict[queue.id] = queue._to_dict()
-        await self.config.guild(guild).Queues.set(queue_dict)
+                if store:
+                    # Player stats for the queue are saved in SQLite
+                    queue_dict[queue.id]["Players"] = {}
+        self.write_behind.save(guild, "Queues", queue_dict, self.config.guild(guild).Queues.set)
+
+    async def _iter_scores(self, guild: discord.Guild, oldest_first=False):
+        """Yields the guild's scores from newest to oldest, or oldest to newest, reading one segment at a time."""
+        store = self._sqlite(guild)
+        if store:
+            async for batch in store.score_batches(guild.id, oldest_first=oldest_first):
+                for score in batch:
+                    yield score
+            return
+
+        head_index, head = await self._score_head(guild)
+        if oldest_first:
+            for index in range(await self.config.guild(guild).ScoreSegmentStart(), head_index):
+                for score in await self.config.custom("ScoreSegment", guild.id, index).Scores():
+                    yield score
+            for score in list(head):
+                yield score
+            return
+
+        for score in reversed(head):
+            yield score
+        segment_start = await self.config.guild(guild).ScoreSegmentStart()
+        for index in range(head_index - 1, segment_start - 1, -1):
+            segment = await self.config.custom("ScoreSegment", guild.id, index).Scores()
+            for score in reversed(segment):
+                yield score
+
+    async def _score_head(self, guild: discord.Guild):
+        """Returns the index and rows of the segment that new scores are appended to."""
+        if guild not in self.score_heads:
+            segment_count = await self.config.guild(guild).ScoreSegments()
+            head_index = max(segment_count - 1, 0)
+            head = await self.config.custom("ScoreSegment", guild.id, head_index).Scores() if segment_count else []
+            self.score_heads[guild] = [head_index, head]
+        return self.score_heads[guild]
+
+    async def _append_scores(self, guild: discord.Guild, scores):
+        """Appends scores to the newest segment, only writing the segments that changed."""
+        store = self._sqlite(guild)
+        if store:
+            return await store.run(store.append_scores, guild.id, scores)
+        async with self.score_locks.setdefault(guild, asyncio.Lock()):
+            head_index, head = await self._score_head(guild)
+            changed = {head_index: head}
+            for score in scores:
+                if len(head) >= SCORE_SEGMENT_SIZE:
+                    head_index += 1
+                    head = changed[head_index] = []
+                head.append(score)
+            self.score_heads[guild] = [head_index, head]
+            for index, rows in changed.items():
+                await self.config.custom("ScoreSegment", guild.id, index).Scores.set(rows)
+            await self.config.guild(guild).ScoreSegments.set(head_index + 1)
+
+    async def _migrate_score_timestamps(self, guild: discord.Guild):
+        """Adds Timestamp to every score that is missing one, one segment at a time. Returns the number of scores updated."""
+        updated = 0
+        if self._sqlite(guild):
+            return updated   # SQLite scores always have a timestamp
+        segment_start = await self.config.guild(guild).ScoreSegmentStart()
+        segment_count = await self.config.guild(guild).ScoreSegments()
+        for index in range(segment_start, segment_count):
+            async with self.score_locks.setdefault(guild, asyncio.Lock()):
+                head_index, head = await self._score_head(guild)
+                segment = head if index == head_index else await self.config.custom("ScoreSegment", guild.id, index).Scores()
+                missing = [score for score in segment if "Timestamp" not in score]
+                for score in missing:
+                    score["Timestamp"] = self._score_timestamp(score)
+                if missing:
+                    await self.config.custom("ScoreSegment", guild.id, index).Scores.set(segment)
+                    updated += len(missing)
+            await asyncio.sleep(0)
+        return updated
+
+    async def _clear_scores(self, guild: discord.Guild):
+        async with self.score_locks.setdefault(guild, asyncio.Lock()):
+            await self.config.custom("ScoreSegment", guild.id).clear()
+            await self.config.guild(guild).ScoreSegments.set(0)
+            await self.config.guild(guild).ScoreSegmentStart.set(0)
+            await self.config.guild(guild).Scores.set([])
+            self.score_heads[guild] = [0, []]
+
+    async def _clear_archive(self, guild: discord.Guild):
+        if guild in self.score_records:
+            self.score_records[guild].close()
+        await asyncio.get_event_loop().run_in_executor(None, self._archive().clear, guild.id)
+        await self.config.guild(guild).ArchivedSegments.set(0)
+        await self.config.guild(guild).PendingCompaction.clear()
+
+    async def _load_score_records(self, guild: discord.Guild):
+        if guild in self.score_records:
+            self.score_records[guild].close()
+        records = self.score_records[guild] = self._archive().records(guild.id)
+        await self._finish_pending_compaction(guild)
+        if await self.config.guild(guild).ArchivedSegments() and not len(records):
+            await asyncio.get_event_loop().run_in_executor(None, self._rebuild_score_records, guild.id, records)
+
+    def _rebuild_score_records(self, guild_id, records: ScoreRecordFile):
+        """Writes the binary records from the compressed archive segments, for archives made before records existed.
+        Runs in an executor."""
+        batch = []
+        for score in self._archive().iter_scores(guild_id):
+            batch.append(score)
+            if len(batch) >= SCORE_SEGMENT_SIZE:
+                records.append(batch, [self._score_timestamp(score) for score in batch])
+                batch = []
+        if batch:
+            records.append(batch, [self._score_timestamp(score) for score in batch])
+
+    async def _iter_archived_scores(self, guild: discord.Guild):
+        """Yields archived scores from oldest to newest, reading them from disk in the executor a batch at a time."""
+        archived_scores = self._archive().iter_scores(guild.id)
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = await loop.run_in_executor(None, lambda: list(itertools.islice(archived_scores, EXPORT_BATCH_SIZE)))
+            if not batch:
+                return
+            for score in batch:
+                yield score
+
+    async def _export_scores(self, guild: discord.Guild, queue_id=None, start_ts=None, end_ts=None):
+        """Yields archived then live scores, oldest first, that match the queue and time range filters."""
+        for scores in (self._iter_archived_scores(guild), self._iter_scores(guild, oldest_first=True)):
+            async for score in scores:
+                if queue_id is not None and score["Queue"] != queue_id:
+                    continue
+                timestamp = self._score_timestamp(score)
+                if (start_ts is not None and timestamp < start_ts) or (end_ts is not None and timestamp >= end_ts):
+                    continue
+                yield dict(score, Timestamp=timestamp)
+
+    async def _write_export(self, path, file_format, fields, rows):
+        """Writes the rows to the export file in the executor, a batch at a time. Returns the number of rows written."""
+        loop = asyncio.get_event_loop()
+        writer = await loop.run_in_executor(None, ExportWriter, path, file_format, fields)
+        try:
+            batch = []
+            async for row in rows:
+                batch.append(row)
+                if len(batch) >= EXPORT_BATCH_SIZE:
+                    await loop.run_in_executor(None, writer.write_rows, batch)
+                    batch = []
+            await loop.run_in_executor(None, writer.write_rows, batch)
+        finally:
+            await loop.run_in_executor(None, writer.close)
+        return writer.rows
+
+    async def _export_players(self, guild: discord.Guild, six_mans_queue: SixMansQueue = None):
+        """Yields player stat rows: guild-wide rows have an empty Queue, followed by the rows of each queue.
+
+        The stats are copied up front, since games finishing while the export is written add players to the live dicts."""
+        sources = [(six_mans_queue.id, six_mans_queue.players)] if six_mans_queue else \
+            [("", await self._players(guild))] + [(queue.id, queue.players) for queue in self.queues[guild]]
+        rows = [dict(stats, Queue=queue_id, Player=player_id) for queue_id, players in sources for player_id, stats in players.items()]
+        for row in rows:
+            yield row
+
+    def _archive(self):
+        return ScoreArchive(cog_data_path(self) / "archive")
+
+    async def _run_compaction(self, ctx: Context, retention_days: int):
+        try:
+            archived = await self._compact_scores(ctx.guild, retention_days)
+        except Exception as e:
+            return await ctx.send(":x: Score compaction failed: {}".format(e))
+        await self._load_score_index(ctx.guild)
+        await ctx.send("Score compaction finished. Archived **{}** score(s).".format(archived))
+
+    async def _compact_scores(self, guild: discord.Guild, retention_days: int):
+        """Archives scores older than the retention period one segment (or SQLite batch) at a time.
+
+        Each archived segment is written to its own compressed file and appended to the binary score records before it is
+        removed from the live history. The segment is recorded as PendingCompaction first, so if the bot stops part way
+        through, the segment is either rolled back or finished by `_finish_pending_compaction` and its scores are never
+        counted twice. Returns the number of scores archived.
+        """
+        cutoff = int(datetime.datetime.now().timestamp()) - retention_days * 86400
+        loop = asyncio.get_event_loop()
+        archive = self._archive()
+        archived = 0
+        while True:
+            async with self.score_locks.setdefault(guild, asyncio.Lock()):
+                await self._finish_pending_compaction(guild)
+                store = self._sqlite(guild)
+                if store:
+                    segment, last_rowid = await store.run(store.scores_before, guild.id, cutoff, SCORE_SEGMENT_SIZE)
+                else:
+                    segment_index = await self.config.guild(guild).ScoreSegmentStart()
+                    head_index = (await self._score_head(guild))[0]
+                    segment = await self.config.custom("ScoreSegment", guild.id, segment_index).Scores() if segment_index < head_index else []
+                    if segment and self._score_timestamp(segment[-1]) >= cutoff:
+                        segment = []    # Only whole segments are compacted
+                if not segment:
+                    return archived
+
+                archive_index = await self.config.guild(guild).ArchivedSegments()
+                records = self.score_records[guild]
+                pending = {"Index": archive_index, "Records": len(records), "Archived": False}
+                if store:
+                    pending.update(Cutoff=cutoff, LastRowid=last_rowid)
+                else:
+                    pending["Segment"] = segment_index
+                await self.config.guild(guild).PendingCompaction.set(pending)
+
+                await loop.run_in_executor(None, archive.write_segment, guild.id, archive_index, segment)
+                await loop.run_in_executor(None, records.append, segment, [self._score_timestamp(score) for score in segment])
+                await self.config.guild(guild).ArchivedSegments.set(archive_index + 1)
+                pending["Archived"] = True
+                await self.config.guild(guild).PendingCompaction.set(pending)
+
+                await self._delete_compacted_scores(guild, pending)
+                await self.config.guild(guild).PendingCompaction.clear()
+                archived += len(segment)
+            await asyncio.sleep(0)
+
+    async def _finish_pending_compaction(self, guild: discord.Guild):
+        """Deals with a segment whose compaction was interrupted. Once it is fully archived, its removal from the live
+        history is finished. Otherwise the partly written archive segment and records are rolled back and the segment
+        stays live, to be archived again by the next compaction."""
+        pending = await self.config.guild(guild).PendingCompaction()
+        if not pending:
+            return
+        if pending["Archived"]:
+            await self._delete_compacted_scores(guild, pending)
+        else:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self._archive().remove_segment, guild.id, pending["Index"])
+            await loop.run_in_executor(None, self.score_records[guild].truncate, pending["Records"])
+            await self.config.guild(guild).ArchivedSegments.set(pending["Index"])
+        await self.config.guild(guild).PendingCompaction.clear()
+
+    async def _delete_compacted_scores(self, guild: discord.Guild, pending):
+        """Removes an archived segment from the live history. Safe to repeat."""
+        store = self._sqlite(guild)
+        if store:
+            await store.run(store.delete_scores_before, guild.id, pending["Cutoff"], pending["LastRowid"])
+        else:
+            await self.config.custom("ScoreSegment", guild.id, pending["Segment"]).clear()
+            await self.config.guild(guild).ScoreSegmentStart.set(pending["Segment"] + 1)
 
-    async def _scores(self, guild: discord.Guild):
-        return await self.config.guild(guild).Scores()
+    async def _migrate_legacy_scores(self, guild: discord.Guild):
+        """Moves scores from the legacy newest-first Scores list into append-only segments."""
+        legacy_scores = await self.config.guild(guild).Scores()
+        if not legacy_scores:
+            return
+        legacy_scores.reverse()
+        for score in legacy_scores:
+            score["Timestamp"] = self._score_timestamp(score)
+        await self._append_scores(guild, legacy_scores)
+        await self.config.guild(guild).Scores.set([])
+
+    async def _load_rollups(self, guild: discord.Guild):
+        if await self.config.guild(guild).RollupsBuilt():
+            self.rollups[guild] = ScoreRollups(await self.config.custom("ScoreRollup", guild.id).all())
+        else:
+            await self._rebuild_rollups(guild)
+        await self._prune_rollups(guild)
+
+    async def _rebuild_rollups(self, guild: discord.Guild):
+        """Builds the rollup buckets from the full score history. Only needed once per guild."""
+        rollups = ScoreRollups()
+        game_scores = []
+        async for score in self._iter_scores(guild):
+            if game_scores and game_scores[0]["Game"] != score["Game"]:
+                self._add_game_scores_to_rollups(rollups, game_scores)
+                game_scores = []
+            game_scores.append(score)
+        if game_scores:
+            self._add_game_scores_to_rollups(rollups, game_scores)
+
+        for key, bucket in rollups.buckets.items():
+            await self.config.custom("ScoreRollup", guild.id, key).set(bucket)
+        await self.config.guild(guild).RollupsBuilt.set(True)
+        self.rollups[guild] = rollups
+
+    def _add_game_scores_to_rollups(self, rollups: ScoreRollups, game_scores):
+        rollups.add_game(game_scores[0]["Queue"], game_scores, self._score_timestamp(game_scores[0]))
+
+    async def _add_to_rollups(self, guild: discord.Guild, six_mans_queue: SixMansQueue, scores, timestamp):
+        rollups = self.rollups[guild]
+        for key in rollups.add_game(six_mans_queue.id, scores, timestamp):
+            await self.config.custom("ScoreRollup", guild.id, key).set(rollups.buckets[key])
+        await self._prune_rollups(guild)
+
+    async def _prune_rollups(self, guild: discord.Guild):
+        prune_before = datetime.datetime.now().timestamp() - HOURLY_ROLLUP_RETENTION
+        for key in self.rollups[guild].prune_hours(prune_before):
+            await self.config.custom("ScoreRollup", guild.id, key).clear()
+
+    async def _load_score_index(self, guild: discord.Guild):
+        """Builds the in-memory column index from the live score history."""
+        score_index = ScoreIndex(complete=not await self.config.guild(guild).ArchivedSegments())
+        async for score in self._iter_scores(guild):
+            score_index.load_newest_first(score, self._score_timestamp(score))
+        score_index.finish_load()
+        self.score_indexes[guild] = score_index
+
+    async def _load_standings(self, guild: discord.Guild):
+        standings = {None: Standings(await self._players(guild))}
+        for six_mans_queue in self.queues[guild]:
+            standings[six_mans_queue.id] = Standings(six_mans_queue.players)
+        self.standings[guild] = standings
+
+    async def _load_sliding_windows(self, guild: discord.Guild):
+        """Fills the sliding windows from the newest end of the score history, and from the archived score records when
+        a short retention period has already compacted games that are still inside the windows."""
+        sliding_windows = {period: SlidingWindow(period.total_seconds()) for period in SLIDING_WINDOWS}
+        start = datetime.datetime.now().timestamp() - max(SLIDING_WINDOWS).total_seconds()
+        games = []      # (timestamp, scores), newest first
+        async for score in self._iter_scores(guild):
+            timestamp = self._score_timestamp(score)
+            if timestamp < start:
+                break
+            if games and games[-1][1][0]["Game"] == score["Game"]:
+                games[-1][1].append(score)
+            else:
+                games.append((timestamp, [score]))
 
-    async def _save_scores(self, guild: discord.Guild, scores):
-        await self.config.guild(guild).Scores.set(scores)
+        archived_games = []     # (timestamp, scores), oldest first
+        archived_scores = await asyncio.get_event_loop().run_in_executor(None, self.score_records[guild].scores, start)
+        for timestamp, score in archived_scores:
+            if archived_games and archived_games[-1][1][0]["Game"] == score["Game"]:
+                archived_games[-1][1].append(score)
+            else:
+                archived_games.append((timestamp, [score]))
+
+        for timestamp, game_scores in archived_games + games[::-1]:
+            for sliding_window in sliding_windows.values():
+                sliding_window.add_game(game_scores[0]["Queue"], game_scores, timestamp)
+        self.sliding_windows[guild] = sliding_windows
+
+    async def _load_seasons(self, guild: discord.Guild):
+        seasons = {}
+        for name, value in (await self.config.guild(guild).Seasons()).items():
+            season = seasons[name] = Season.from_dict(name, value)
+            season.load(self.rollups[guild])
+        self.seasons[guild] = seasons
+
+    def _standings(self, guild: discord.Guild, six_mans_queue: SixMansQueue = None):
+        """The all-time standings for the queue, or guild-wide if no queue is given."""
+        queue_id = six_mans_queue.id if six_mans_queue else None
+        standings = self.standings[guild].get(queue_id)
+        if standings is None:
+            standings = self.standings[guild][queue_id] = Standings(six_mans_queue.players if six_mans_queue else {})
+        return standings
+
+    def _add_to_standings(self, guild: discord.Guild, six_mans_queue: SixMansQueue, scores):
+        queue_standings = self._standings(guild, six_mans_queue)
+        guild_standings = self._standings(guild)
+        for score in scores:
+            queue_standings.add_score(score)
+            guild_standings.add_score(score)
+
+    def _add_to_window_standings(self, guild: discord.Guild, six_mans_queue: SixMansQueue, scores):
+        """Adds a finished game to the cached window standings it counts towards, instead of having them rebuilt."""
+        cache = self.window_standings.get(guild, {})
+        for (period, queue_id), (built_at, standings, games_played) in list(cache.items()):
+            if queue_id is None or queue_id == six_mans_queue.id:
+                for score in scores:
+                    standings.add_score(score)
+                cache[(period, queue_id)] = (built_at, standings, games_played + 1)
+
+    async def _clear_rollups(self, guild: discord.Guild):
+        await self.config.custom("ScoreRollup", guild.id).clear()
+        await self.config.guild(guild).RollupsBuilt.set(True)
+        self.rollups[guild] = ScoreRollups()
 
     async def _games_played(self, guild: discord.Guild):
-        return await self.config.guild(guild).GamesPlayed()
+        return await self.write_behind.get(guild, "GamesPlayed", self.config.guild(guild).GamesPlayed)
 
     async def _save_games_played(self, guild: discord.Guild, games_played: int):
-        await self.config.guild(guild).GamesPlayed.set(games_played)
+        self.write_behind.save(guild, "GamesPlayed", games_played, self.config.guild(guild).GamesPlayed.set)
 
     async def _player_timeout(self, guild: discord.Guild):
         return await self.config.guild(guild).PlayerTimeout()
@@ -1765,10 +2703,27 @@ class SixMans(commands.Cog):
         await self.config.guild(guild).PlayerTimeout.set(time_seconds)
 
     async def _players(self, guild: discord.Guild):
-        return await self.config.guild(guild).Players()
+        store = self._sqlite(guild)
+        if store:
+            return await store.run(store.players, guild.id)
+        return await self.write_behind.get(guild, "Players", self.config.guild(guild).Players)
 
     async def _save_players(self, guild: discord.Guild, players):
-        await self.config.guild(guild).Players.set(players)
+        store = self._sqlite(guild)
+        if store:
+            return await store.run(store.set_players, guild.id, None, players)
+        self.write_behind.save(guild, "Players", players, self.config.guild(guild).Players.set)
+
+    async def _save_player_scores(self, guild: discord.Guild, six_mans_queue: SixMansQueue, scores):
+        """Adds a finished game's scores to the guild-wide player stats."""
+        store = self._sqlite(guild)
+        if store:
+            # Row level update of both the guild-wide and the queue stats
+            return await store.run(store.add_player_scores, guild.id, six_mans_queue.id, scores)
+        players = await self._players(guild)
+        for score in scores:
+            self._give_points(players, score)
+        await self._save_players(guild, players)
 
     async def _get_automove(self, guild: discord.Guild):
         return await self.config.guild(guild).AutoMove()
@@ -0,0 +1,39 @@
+from collections import deque
+
+from .ranking import Standings
+
+class SlidingWindow:
+    """Standings for the games of the last length seconds, per queue and guild-wide.
+
+    Finished games are added as they happen and taken back out once they fall outside the window, so the standings are
+    always current without going back to the score history.
+    """
+    def __init__(self, length):
+        self.length = length
+        self.games = deque()        # (timestamp, queue id, scores), oldest first
+        self.standings = {None: Standings()}
+        self.games_played = {None: 0}
+
+    def add_game(self, queue_id, scores, timestamp):
+        self.games.append((timestamp, queue_id, scores))
+        for key in (None, queue_id):
+            standings = self.standings.get(key)
+            if standings is None:
+                standings = self.standings[key] = Standings()
+            for score in scores:
+                standings.add_score(score)
+            self.games_played[key] = self.games_played.get(key, 0) + 1
+
+    def expire(self, now):
+        """Removes the games that finished before the start of the window."""
+        start = now - self.length
+        while self.games and self.games[0][0] < start:
+            timestamp, queue_id, scores = self.games.popleft()
+            for key in (None, queue_id):
+                for score in scores:
+                    self.standings[key].remove_score(score)
+                self.games_played[key] -= 1
+
+    def window(self, queue_id=None):
+        """Standings and games played for the queue, or guild-wide if no queue is given."""
+        return self.standings.get(queue_id) or Standings(), self.games_played.get(queue_id, 0)
@@ -0,0 +1,197 @@
+import asyncio
+import datetime
+import functools
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from .strings import Strings
+
+GUILD_QUEUE_ID = ""     # queue_id used for a player's totals across every queue in the guild
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    guild_id INTEGER NOT NULL,
+    game_id TEXT NOT NULL,
+    queue_id TEXT NOT NULL,
+    player_id INTEGER NOT NULL,
+    win INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    date_time TEXT
+);
+CREATE INDEX IF NOT EXISTS scores_guild_time ON scores (guild_id, timestamp);
+CREATE INDEX IF NOT EXISTS scores_guild_queue_time ON scores (guild_id, queue_id, timestamp);
+CREATE INDEX IF NOT EXISTS scores_guild_player ON scores (guild_id, player_id);
+
+CREATE TABLE IF NOT EXISTS players (
+    guild_id INTEGER NOT NULL,
+    queue_id TEXT NOT NULL,
+    player_id TEXT NOT NULL,
+    points INTEGER NOT NULL DEFAULT 0,
+    games_played INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, queue_id, player_id)
+);
+CREATE INDEX IF NOT EXISTS players_standings ON players (guild_id, queue_id, points DESC, wins DESC);
+
+CREATE TABLE IF NOT EXISTS games (
+    guild_id INTEGER NOT NULL,
+    game_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (guild_id, game_id)
+);
+"""
+
+class SQLiteStore:
+    """Local SQLite storage for scores, player totals and active games.
+
+    Rows use the same shapes as the Config data so the cog can switch between the two. The connection is only used from
+    the store's own thread: call the methods through run() so queries and commits don't block the event loop.
+    """
+    def __init__(self, path):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sixMans-sqlite")
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(scores)")]
+        if "date_time" not in columns:
+            # Databases created before DateTime was stored
+            self.connection.execute("ALTER TABLE scores ADD COLUMN date_time TEXT")
+
+    async def run(self, method, *args, **kwargs):
+        """Runs one of the store's methods on its thread. Calls run one at a time, in the order they were made."""
+        return await asyncio.get_event_loop().run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    async def score_batches(self, guild_id, batch_size=1000, oldest_first=False):
+        """Yields lists of scores, newest first unless oldest_first is set. Each batch is a separate indexed query."""
+        last_rowid = None
+        while True:
+            batch, last_rowid = await self.run(self.score_batch, guild_id, last_rowid, batch_size, oldest_first)
+            if not batch:
+                return
+            yield batch
+
+    async def close(self):
+        """Closes the connection once every call already made has finished."""
+        await self.run(self.connection.close)
+        self._executor.shutdown(wait=False)
+
+    # Scores
+    def append_scores(self, guild_id, scores):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO scores (guild_id, game_id, queue_id, player_id, win, points, timestamp, date_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(guild_id, str(score["Game"]), str(score["Queue"]), score["Player"], score["Win"], score["Points"], score["Timestamp"],
+                    score.get("DateTime")) for score in scores]
+            )
+
+    def score_batch(self, guild_id, after_rowid=None, batch_size=1000, oldest_first=False):
+        """Returns up to batch_size scores following after_rowid (from the start if None), and the rowid of the last one."""
+        order, compare = ("ASC", ">") if oldest_first else ("DESC", "<")
+        if after_rowid is None:
+            after_rowid = -1 if oldest_first else 2 ** 63 - 1
+        rows = self.connection.execute(
+            "SELECT rowid, game_id, queue_id, player_id, win, points, timestamp, date_time FROM scores "
+            "WHERE guild_id = ? AND rowid {} ? ORDER BY rowid {} LIMIT ?".format(compare, order),
+            (guild_id, after_rowid, batch_size)
+        ).fetchall()
+        return [self._score_from_row(row) for row in rows], (rows[-1][0] if rows else None)
+
+    def scores_before(self, guild_id, before_ts, limit):
+        """Returns up to limit of the oldest scores saved before before_ts, and the rowid of the last one."""
+        rows = self.connection.execute(
+            "SELECT rowid, game_id, queue_id, player_id, win, points, timestamp, date_time FROM scores "
+            "WHERE guild_id = ? AND timestamp < ? ORDER BY rowid ASC LIMIT ?",
+            (guild_id, before_ts, limit)
+        ).fetchall()
+        return [self._score_from_row(row) for row in rows], (rows[-1][0] if rows else None)
+
+    def delete_scores_before(self, guild_id, before_ts, last_rowid):
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM scores WHERE guild_id = ? AND timestamp < ? AND rowid <= ?",
+                (guild_id, before_ts, last_rowid)
+            )
+
+    def _score_from_row(self, row):
+        return {
+            "Game": int(row[1]),
+            "Queue": int(row[2]),
+            "Player": row[3],
+            "Win": row[4],
+            "Points": row[5],
+            # Scores saved before DateTime was stored get it from the timestamp, in the same format SixMans uses
+            "DateTime": row[7] or datetime.datetime.fromtimestamp(row[6]).strftime("%d-%b-%Y (%H:%M:%S.%f)"),
+            "Timestamp": row[6]
+        }
+
+    # Player totals
+    def add_player_scores(self, guild_id, queue_id, scores):
+        """Adds each score to the player's guild-wide totals and their totals for the queue."""
+        rows = []
+        for score in scores:
+            for totals_queue_id in (GUILD_QUEUE_ID, str(queue_id)):
+                rows.append((guild_id, totals_queue_id, str(score["Player"]), score["Points"], score["Win"]))
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO players (guild_id, queue_id, player_id, points, games_played, wins) VALUES (?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT (guild_id, queue_id, player_id) DO UPDATE SET "
+                "points = points + excluded.points, games_played = games_played + 1, wins = wins + excluded.wins",
+                rows
+            )
+
+    def players(self, guild_id, queue_id=None):
+        """Player totals ordered by points then wins, in the same shape as the Config Players dict."""
+        queue_id = GUILD_QUEUE_ID if queue_id is None else str(queue_id)
+        rows = self.connection.execute(
+            "SELECT player_id, points, games_played, wins FROM players WHERE guild_id = ? AND queue_id = ? ORDER BY points DESC, wins DESC",
+            (guild_id, queue_id)
+        )
+        return {
+            player_id: {
+                Strings.PLAYER_POINTS_KEY: points,
+                Strings.PLAYER_GP_KEY: games_played,
+                Strings.PLAYER_WINS_KEY: wins
+            } for player_id, points, games_played, wins in rows
+        }
+
+    def set_players(self, guild_id, queue_id, players):
+        queue_id = GUILD_QUEUE_ID if queue_id is None else str(queue_id)
+        with self.connection:
+            self.connection.execute("DELETE FROM players WHERE guild_id = ? AND queue_id = ?", (guild_id, queue_id))
+            self.connection.executemany(
+                "INSERT INTO players (guild_id, queue_id, player_id, points, games_played, wins) VALUES (?, ?, ?, ?, ?, ?)",
+                [(guild_id, queue_id, str(player_id), stats.get(Strings.PLAYER_POINTS_KEY, 0), stats.get(Strings.PLAYER_GP_KEY, 0),
+                    stats.get(Strings.PLAYER_WINS_KEY, 0)) for player_id, stats in players.items()]
+            )
+
+    # Active games
+    def games(self, guild_id):
+        rows = self.connection.execute("SELECT game_id, data FROM games WHERE guild_id = ?", (guild_id,))
+        return {game_id: json.loads(data) for game_id, data in rows}
+
+    def save_games(self, guild_id, games):
+        with self.connection:
+            self.connection.execute("DELETE FROM games WHERE guild_id = ?", (guild_id,))
+            self.connection.executemany(
+                "INSERT INTO games (guild_id, game_id, data) VALUES (?, ?, ?)",
+                [(guild_id, str(game_id), json.dumps(game_dict)) for game_id, game_dict in games.items()]
+            )
+
+    def save_game(self, guild_id, game_id, game_dict):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO games (guild_id, game_id, data) VALUES (?, ?, ?)",
+                (guild_id, str(game_id), json.dumps(game_dict))
+            )
+
+    def remove_game(self, guild_id, game_id):
+        with self.connection:
+            self.connection.execute("DELETE FROM games WHERE guild_id = ? AND game_id = ?", (guild_id, str(game_id)))
+
+    def clear_guild(self, guild_id):
+        with self.connection:
+            for table in ("scores", "players", "games"):
+                self.connection.execute("DELETE FROM {} WHERE guild_id = ?".format(table), (guild_id,))
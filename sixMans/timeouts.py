@@ -0,0 +1,93 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+log = logging.getLogger("red.sixMans")
+
+class TimeoutScheduler:
+    """Runs every queue timeout from a single task, using a heap ordered by expiry time.
+
+    Cancelling or rescheduling a key only drops it from the live entries, which is O(1). Stale heap entries are skipped
+    when they reach the top, and the heap is rebuilt if they start to outnumber the live ones.
+    """
+    def __init__(self, callback):
+        self.callback = callback    # Coroutine function called with the key's arguments when it expires
+        self.task: asyncio.Task = None
+        self._heap = []             # (expires_at, sequence, key)
+        self._entries = {}          # key -> (expires_at, sequence)
+        self._sequence = itertools.count()
+        self._wakeup = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def schedule(self, key, delay):
+        """Expires key after delay seconds, replacing any earlier schedule for it. key is a tuple of callback arguments."""
+        expires_at = time.time() + delay
+        sequence = next(self._sequence)
+        self._entries[key] = (expires_at, sequence)
+        heapq.heappush(self._heap, (expires_at, sequence, key))
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._rebuild()
+        if self.task is None or self.task.done():
+            self._wakeup = asyncio.Event()
+            self.task = asyncio.create_task(self._run())
+        elif self._heap[0][1] == sequence:
+            self._wakeup.set()
+
+    def cancel(self, key):
+        return self._entries.pop(key, None) is not None
+
+    def expires_at(self, key):
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def upcoming(self, count, include=None):
+        """The next count (expires_at, key) pairs, soonest first, optionally only keys for which include(key) is true."""
+        entries = ((expires_at, key) for key, (expires_at, sequence) in self._entries.items() if include is None or include(key))
+        return heapq.nsmallest(count, entries, key=lambda entry: entry[0])
+
+    def clear(self):
+        self._entries.clear()
+        self._heap.clear()
+
+    def close(self):
+        self.clear()
+        if self.task:
+            self.task.cancel()
+
+    async def _run(self):
+        while self._entries:
+            expires_at, sequence, key = self._heap[0]
+            if self._entries.get(key, (None, None))[1] != sequence:
+                heapq.heappop(self._heap)
+                continue
+
+            delay = expires_at - time.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            del self._entries[key]
+            asyncio.create_task(self._expire(key))
+        self._heap.clear()
+
+    async def _expire(self, key):
+        try:
+            await self.callback(*key)
+        except Exception:
+            log.exception("Queue timeout callback failed for %r", key)
+
+    def _rebuild(self):
+        self._heap = [(expires_at, sequence, key) for key, (expires_at, sequence) in self._entries.items()]
+        heapq.heapify(self._heap)
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+
+log = logging.getLogger("red.sixMans")
+
+class WriteBehind:
+    """Coalesces saves so each (guild, key) is written at most once per interval, with its latest value.
+
+    Pending values are returned by get() so reads never see stale saved data.
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self.pending = {}   # (guild, key) -> (writer, value)
+        self.task: asyncio.Task = None
+        self.saves = 0      # Saves requested
+        self.writes = 0     # Writes actually made
+
+    def save(self, guild, key, value, writer):
+        """Queues value to be written with the async writer(value) on the next flush."""
+        self.pending[(guild, key)] = (writer, value)
+        self.saves += 1
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._flush_loop())
+
+    async def get(self, guild, key, load):
+        """Returns the pending value for the key, or the saved value from the async load()."""
+        try:
+            return self.pending[(guild, key)][1]
+        except KeyError:
+            return await load()
+
+    async def flush(self, guild=None):
+        """Writes every pending value, or only the guild's if one is given. Returns the number of keys written."""
+        written = 0
+        for pending_key in [key for key in self.pending if guild is None or key[0] == guild]:
+            writer, value = self.pending.pop(pending_key)
+            saved = False
+            try:
+                await writer(value)
+                saved = True
+                written += 1
+            except Exception:
+                log.exception("Failed to save %s for guild %s, it will be retried", pending_key[1], pending_key[0])
+            finally:
+                if not saved:
+                    # Keep the value for the next flush unless a newer one has been saved meanwhile, including when
+                    # the flush is cancelled in the middle of the write
+                    self.pending.setdefault(pending_key, (writer, value))
+        self.writes += written
+        return written
+
+    def cancel(self):
+        if self.task:
+            self.task.cancel()
+
+    async def close(self):
+        """Stops the flush loop, waits for it to finish, then writes everything still pending."""
+        self.cancel()
+        if self.task:
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        return await self.flush()
+
+    async def _flush_loop(self):
+        while self.pending:
+            await asyncio.sleep(self.interval)
+            await self.flush()